@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for migrate_legacy_content.
+
+Generates synthetic legacy lesson arrays (stem/answer_index/what/why/how
+items) of increasing size and measures items/second and peak traced memory
+for each migration path:
+
+  memory     json.load + migrate_item over the whole array + atomic rewrite
+  streaming  iter_json_array + migrate_item, items written out one by one + atomic
+             rewrite. Bench-only prototype: migrate_legacy_content has no streaming
+             writer (its streaming path is --dry-run, which writes nothing), so this
+             row shows what such a writer would buy, not a path the tool runs.
+  parallel   process_file over sharded files on a thread pool (the main() path),
+             which also hashes input/output and commits salvaged fields to SQLite
+
+All three read, migrate, serialise and rewrite every file, so items/s is
+comparable; parallel's extra hashing and salvage work is listed in the output.
+With --profile, parallel is profiled inside each worker and the stats merged.
+
+Usage:
+  python3 scripts/bench_migrate_legacy_content.py --sizes 1000,10000,100000
+  python3 scripts/bench_migrate_legacy_content.py --profile --tracemalloc
+"""
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import migrate_legacy_content as mlc
+
+PATHS = ('memory', 'streaming', 'parallel')
+WORK = {
+    'memory': 'read+migrate+write',
+    'streaming': 'read+migrate+write (bench-only prototype, not in migrate_legacy_content)',
+    'parallel': 'read+migrate+write+sha256+salvage',
+}
+
+
+def synthetic_items(count):
+    for i in range(count):
+        yield {
+            'id': f"bench_l{i // 1000:03d}_{i % 1000:03d}",
+            'stem': f"ベンチマーク用の設問 {i}: どれが正しい？",
+            'choices': ["選択肢A", "選択肢B", "選択肢C"],
+            'answer_index': i % 3,
+            'what': "【What】現象の説明テキスト。" * 3,
+            'why': "【Why】メカニズムの説明テキスト。" * 3,
+            'how': "💡 Try this: 行動提案のテキスト。" * 2,
+            'tip': "補足のヒント",
+            'emoji_hint': "🧠",
+            'difficulty': 'medium',
+            'xp': 10,
+        }
+
+
+def write_fixture(directory, count, shards):
+    """Write `count` items split across `shards` files; returns the paths."""
+    paths = []
+    per_shard = -(-count // shards)
+    items = synthetic_items(count)
+    for shard in range(shards):
+        path = os.path.join(directory, f"bench_{shard:03d}.json")
+        chunk = [item for _, item in zip(range(per_shard), items)]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(chunk, f, ensure_ascii=False, indent=2)
+        paths.append(path)
+    return paths
+
+
+def run_memory(paths, _workers, _scratch, _profiles=None):
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for item in data:
+            mlc.migrate_item(item, verbose=False)
+        mlc.write_json_atomic(path, data)
+
+
+def run_streaming(paths, _workers, _scratch, _profiles=None):
+    # Prototype writer that exists only here; see the module docstring.
+    for path in paths:
+        tmp_path = f"{path}.tmp"
+        with open(path, 'r', encoding='utf-8') as f, open(tmp_path, 'w', encoding='utf-8') as out:
+            out.write('[')
+            for index, item in enumerate(mlc.iter_json_array(f)):
+                mlc.migrate_item(item, verbose=False)
+                out.write(',\n' if index else '\n')
+                out.write(json.dumps(item, ensure_ascii=False, indent=2))
+            out.write('\n]')
+        os.replace(tmp_path, path)
+
+
+def run_parallel(paths, workers, scratch, profiles=None):
+    salvage_path = os.path.join(scratch, 'salvage.sqlite')
+
+    def work(path):
+        if profiles is None:
+            return mlc.process_file(path, None, 'bench', salvage_path)
+        # cProfile only sees the thread it was enabled on, so each worker profiles itself.
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return mlc.process_file(path, None, 'bench', salvage_path)
+        finally:
+            profiler.disable()
+            profiles.append(profiler)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(work, paths))
+
+
+RUNNERS = {'memory': run_memory, 'streaming': run_streaming, 'parallel': run_parallel}
+
+
+def measure(path_name, fixture_dir, workers, profile=False, trace=False):
+    """Run one path on a fresh copy of the fixture. Returns (seconds, peak_bytes, report)."""
+    runner = RUNNERS[path_name]
+    report = ''
+    with tempfile.TemporaryDirectory(prefix='bench-run-') as scratch:
+        paths = [shutil.copy(os.path.join(fixture_dir, name), scratch) for name in sorted(os.listdir(fixture_dir))]
+
+        # Timed run without tracing overhead.
+        with contextlib.redirect_stdout(io.StringIO()):
+            profiles = [] if profile else None
+            profiler = cProfile.Profile() if profile and path_name != 'parallel' else None
+            started = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            runner(paths, workers, scratch, profiles)
+            if profiler:
+                profiler.disable()
+                profiles.append(profiler)
+            seconds = time.perf_counter() - started
+        if profiles:
+            out = io.StringIO()
+            stats = pstats.Stats(profiles[0], stream=out)
+            for extra in profiles[1:]:
+                stats.add(extra)
+            stats.sort_stats('cumulative').print_stats(12)
+            report += out.getvalue()
+
+    # Separate run for peak memory, since tracemalloc skews timings.
+    with tempfile.TemporaryDirectory(prefix='bench-run-') as scratch:
+        paths = [shutil.copy(os.path.join(fixture_dir, name), scratch) for name in sorted(os.listdir(fixture_dir))]
+        tracemalloc.start(25 if trace else 1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            runner(paths, workers, scratch)
+        _current, peak = tracemalloc.get_traced_memory()
+        if trace:
+            stats = tracemalloc.take_snapshot().statistics('lineno')[:8]
+            report += "\n".join(f"    {stat}" for stat in stats) + "\n"
+        tracemalloc.stop()
+    return seconds, peak, report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark migrate_legacy_content throughput and peak memory.")
+    parser.add_argument('--sizes', default='1000,10000,50000', help="Comma-separated item counts")
+    parser.add_argument('--paths', default=','.join(PATHS), help=f"Comma-separated subset of {', '.join(PATHS)}")
+    parser.add_argument('--shards', type=int, default=8, help="Files the items are split across")
+    parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1), help="Thread pool size for the parallel path")
+    parser.add_argument('--profile', action='store_true', help="Print the top cProfile entries for each run")
+    parser.add_argument('--tracemalloc', action='store_true', help="Print the top allocation sites for each run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    paths = [path for path in args.paths.split(',') if path]
+    unknown = set(paths) - set(PATHS)
+    if unknown:
+        raise SystemExit(f"Unknown path(s): {', '.join(sorted(unknown))}")
+
+    print(f"{'items':>9}  {'path':<10} {'seconds':>9} {'items/s':>11} {'peak MiB':>9}  work")
+    for count in sizes:
+        with tempfile.TemporaryDirectory(prefix='bench-fixture-') as fixture_dir:
+            write_fixture(fixture_dir, count, max(1, args.shards))
+            for path_name in paths:
+                seconds, peak, report = measure(path_name, fixture_dir, max(1, args.workers), args.profile, args.tracemalloc)
+                rate = count / seconds if seconds else float('inf')
+                print(f"{count:>9}  {path_name:<10} {seconds:>9.3f} {rate:>11,.0f} {peak / (1 << 20):>9.1f}  {WORK[path_name]}")
+                if report:
+                    print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for worktree-status-buckets.
+
+Builds synthetic `git status --porcelain=v2 -z` streams whose paths are drawn
+from the prefix rules in scripts/worktree-buckets.json and the
+data/lessons/<theme>_units/<lesson>.<locale>.json layout (the shape of a bulk
+locale regeneration), then measures paths/second and peak traced memory for:
+
+  parse     parse_porcelain_v2 over the byte stream
+  classify  BucketMatcher.bucket_for over already-parsed entries
+  pipeline  parse + classify + grouping (the main() path without git)
+  linear    first-match startswith scan over the same rules (pre-trie baseline)
+
+Usage:
+  python3 scripts/bench_worktree_status_buckets.py --sizes 1000,20000,200000
+  python3 scripts/bench_worktree_status_buckets.py --budget-ms 500   # exit 1 if pipeline is slower
+"""
+import argparse
+import io
+import json
+import random
+import time
+import tracemalloc
+
+from lesson_corpus import LESSONS_DIR, LOCALES, iter_unit_dirs, load_script
+
+STAGES = ('parse', 'classify', 'pipeline', 'linear')
+SUFFIXES = ('index.ts', 'Screen.tsx', 'helpers.ts', 'README.md', 'config.json')
+
+
+def plain_prefixes(config_path):
+    """Unconditional prefix rules per bucket, in config order."""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return [
+        (bucket['name'], [rule for rule in bucket['rules']
+                          if isinstance(rule, str) and not rule.startswith('!') and not set(rule) & set('*?[')])
+        for bucket in config['buckets']
+    ]
+
+
+def synthetic_paths(count, prefixes, seed=0):
+    """Mostly lesson locale files, the rest under bucket prefixes or unmatched."""
+    rng = random.Random(seed)
+    themes = [theme for theme, _path in iter_unit_dirs(LESSONS_DIR)] or ['mental']
+    flat = [prefix for _name, rules in prefixes for prefix in rules]
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            theme = rng.choice(themes)
+            yield f"data/lessons/{theme}_units/{theme}_l{i // len(LOCALES) % 100:02d}.{LOCALES[i % len(LOCALES)]}.json"
+        elif roll < 0.95:
+            prefix = rng.choice(flat)
+            yield prefix + (f"gen{i}/{rng.choice(SUFFIXES)}" if prefix.endswith('/') else f"{i}.ts")
+        else:
+            yield f"misc/untracked_{i}.txt"
+
+
+def synthetic_stream(paths, seed=0):
+    """Encode paths as porcelain v2 -z records: ordinary, rename and untracked."""
+    rng = random.Random(seed)
+    sha = '0' * 40
+    out = io.BytesIO()
+    for path in paths:
+        roll = rng.random()
+        if roll < 0.8:
+            record = f"1 .M N... 100644 100644 100644 {sha} {sha} {path}\0"
+        elif roll < 0.85:
+            record = f"2 R. N... 100644 100644 100644 {sha} {sha} R100 {path}\0old/{path}\0"
+        else:
+            record = f"? {path}\0"
+        out.write(record.encode('utf-8'))
+    return out.getvalue()
+
+
+def linear_bucket_for(path, prefixes):
+    for name, rules in prefixes:
+        if any(path.startswith(prefix) for prefix in rules):
+            return name
+    return 'other'
+
+
+def run_stage(stage, module, matcher, prefixes, stream, entries):
+    if stage == 'parse':
+        for _entry in module.parse_porcelain_v2(io.BytesIO(stream)):
+            pass
+    elif stage == 'classify':
+        for entry in entries:
+            matcher.bucket_for(entry.path, entry.status)
+    elif stage == 'pipeline':
+        grouped = module.empty_groups(matcher)
+        for entry in module.parse_porcelain_v2(io.BytesIO(stream)):
+            grouped[module.classify(entry, matcher)].append(entry)
+    else:
+        for entry in entries:
+            linear_bucket_for(entry.path, prefixes)
+
+
+def measure(stage, module, matcher, prefixes, stream, entries):
+    """Returns (seconds, peak_bytes); memory is traced in a separate run to keep timings clean."""
+    started = time.perf_counter()
+    run_stage(stage, module, matcher, prefixes, stream, entries)
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    run_stage(stage, module, matcher, prefixes, stream, entries)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark worktree-status-buckets parsing and classification.")
+    parser.add_argument('--sizes', default='1000,10000,50000,200000', help="Comma-separated path counts")
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"Comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget-ms', type=float, default=0,
+                        help="Exit 1 when the pipeline stage exceeds this many milliseconds at any size")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    stages = [stage for stage in args.stages.split(',') if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+
+    module = load_script('worktree-status-buckets.py')
+    matcher = module.load_matcher(module.CONFIG_PATH, cache_path=None)
+    prefixes = plain_prefixes(module.CONFIG_PATH)
+    over_budget = False
+    print(f"{'paths':>9}  {'stage':<9} {'seconds':>9} {'paths/s':>12} {'peak MiB':>9}")
+    for count in sizes:
+        stream = synthetic_stream(synthetic_paths(count, prefixes, args.seed), args.seed)
+        entries = list(module.parse_porcelain_v2(io.BytesIO(stream)))
+        for stage in stages:
+            seconds, peak = measure(stage, module, matcher, prefixes, stream, entries)
+            rate = count / seconds if seconds else float('inf')
+            print(f"{count:>9}  {stage:<9} {seconds:>9.3f} {rate:>12,.0f} {peak / (1 << 20):>9.1f}")
+            if stage == 'pipeline' and args.budget_ms and seconds * 1000 > args.budget_ms:
+                over_budget = True
+    if over_budget:
+        print(f"❌ pipeline exceeded the {args.budget_ms:g} ms budget")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
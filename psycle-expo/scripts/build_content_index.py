@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""Build and query a local SQLite index of the lesson corpus.
+
+Loads every lesson locale file, evidence and continuity sidecar, theme meta
+and curated source into .cache/content_index.sqlite. Each run re-reads only
+files whose mtime/size and hash changed since the previous run.
+
+Usage:
+  python3 scripts/build_content_index.py
+  python3 scripts/build_content_index.py --query sources
+  python3 scripts/build_content_index.py --query "SELECT q.id, q.question FROM questions q
+      JOIN citations c ON c.lesson_id = q.lesson_id
+      WHERE q.theme = 'money' AND q.locale = 'ja' AND q.difficulty = 'hard'
+        AND c.source_type = 'meta_analysis'"
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from lesson_corpus import (CACHE_DIR, DATA_DIR, LESSONS_DIR, LOCALES, SIDECAR_KINDS, connect_index, iter_lesson_files,
+                           sync_index)
+
+DB_PATH = os.path.join(CACHE_DIR, 'content_index.sqlite')
+THEMES_DIR = os.path.join(DATA_DIR, 'themes')
+CURATED_SOURCES_PATH = os.path.join(DATA_DIR, 'curated_sources.json')
+
+# Bump when the schema or loaders change; the index is rebuilt from scratch.
+INDEX_SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    file TEXT NOT NULL, id TEXT, lesson_id TEXT, theme TEXT, locale TEXT, position INTEGER,
+    type TEXT, difficulty TEXT, xp INTEGER, source_id TEXT, evidence_grade TEXT,
+    question TEXT, explanation TEXT, choices TEXT, data TEXT,
+    PRIMARY KEY (file, position)
+);
+CREATE INDEX IF NOT EXISTS questions_id ON questions (id, locale);
+CREATE INDEX IF NOT EXISTS questions_lesson ON questions (lesson_id, locale);
+CREATE INDEX IF NOT EXISTS questions_source ON questions (source_id);
+CREATE INDEX IF NOT EXISTS questions_theme ON questions (theme, difficulty);
+CREATE TABLE IF NOT EXISTS evidence (
+    file TEXT NOT NULL, lesson_id TEXT PRIMARY KEY, theme TEXT, source_type TEXT, evidence_grade TEXT,
+    confidence TEXT, status TEXT, claim TEXT, last_verified TEXT, data TEXT
+);
+CREATE INDEX IF NOT EXISTS evidence_file ON evidence (file);
+CREATE TABLE IF NOT EXISTS citations (
+    file TEXT NOT NULL, lesson_id TEXT NOT NULL, position INTEGER, role TEXT, source_type TEXT,
+    doi TEXT, pmid TEXT, url TEXT, label TEXT
+);
+CREATE INDEX IF NOT EXISTS citations_file ON citations (file);
+CREATE INDEX IF NOT EXISTS citations_lesson ON citations (lesson_id);
+CREATE INDEX IF NOT EXISTS citations_doi ON citations (doi);
+CREATE INDEX IF NOT EXISTS citations_pmid ON citations (pmid);
+CREATE INDEX IF NOT EXISTS citations_source_type ON citations (source_type);
+CREATE TABLE IF NOT EXISTS continuity (
+    file TEXT NOT NULL, lesson_id TEXT PRIMARY KEY, theme TEXT, schema_version INTEGER,
+    continuity_mode TEXT, continuity_route TEXT, data TEXT
+);
+CREATE INDEX IF NOT EXISTS continuity_file ON continuity (file);
+CREATE TABLE IF NOT EXISTS themes (
+    file TEXT NOT NULL, theme_id TEXT PRIMARY KEY, schema_version INTEGER, theme_status TEXT,
+    rollout_stage TEXT, data TEXT
+);
+CREATE INDEX IF NOT EXISTS themes_file ON themes (file);
+CREATE TABLE IF NOT EXISTS curated_sources (
+    file TEXT NOT NULL, source_id TEXT PRIMARY KEY, author TEXT, year INTEGER, title TEXT, type TEXT,
+    evidence_strength TEXT, data TEXT
+);
+CREATE INDEX IF NOT EXISTS curated_sources_file ON curated_sources (file);
+"""
+
+ROW_TABLES = ('questions', 'evidence', 'citations', 'continuity', 'themes', 'curated_sources')
+
+QUERIES = {
+    'sources': """
+        SELECT q.source_id, COUNT(DISTINCT q.id) AS questions, GROUP_CONCAT(DISTINCT q.theme) AS themes,
+               cs.evidence_strength
+        FROM questions q LEFT JOIN curated_sources cs ON cs.source_id = q.source_id
+        GROUP BY q.source_id ORDER BY questions DESC, q.source_id
+    """,
+    'uncurated-sources': """
+        SELECT DISTINCT q.source_id FROM questions q
+        LEFT JOIN curated_sources cs ON cs.source_id = q.source_id
+        WHERE cs.source_id IS NULL ORDER BY q.source_id
+    """,
+    'lessons-without-evidence': """
+        SELECT DISTINCT q.lesson_id FROM questions q
+        LEFT JOIN evidence e ON e.lesson_id = q.lesson_id
+        WHERE e.lesson_id IS NULL ORDER BY q.lesson_id
+    """,
+}
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return _json(value)
+
+
+def load_questions(conn, relpath, theme, lesson_id, locale, data):
+    conn.executemany(
+        "INSERT OR REPLACE INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (relpath, item.get('id'), lesson_id, theme, locale, position, item.get('type'), item.get('difficulty'),
+             item.get('xp'), item.get('source_id'), item.get('evidence_grade'), _text(item.get('question')),
+             _text(item.get('explanation')), _json(item.get('choices')), _json(item))
+            for position, item in enumerate(data)
+            if isinstance(item, dict)
+        ],
+    )
+
+
+def load_evidence(conn, relpath, theme, lesson_id, data):
+    conn.execute(
+        "INSERT OR REPLACE INTO evidence VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (relpath, lesson_id, theme, data.get('source_type'), data.get('evidence_grade'), _text(data.get('confidence')),
+         _text(data.get('status')), _text(data.get('claim')), _text(data.get('last_verified')), _json(data)),
+    )
+    conn.executemany(
+        "INSERT INTO citations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (relpath, lesson_id, position, citation.get('role'), citation.get('source_type', data.get('source_type')),
+             (citation.get('doi') or '').strip().lower() or None, str(citation.get('pmid') or '').strip() or None,
+             citation.get('url') or None, citation.get('label'))
+            for position, citation in enumerate(data.get('citations') or [])
+            if isinstance(citation, dict)
+        ],
+    )
+
+
+def load_continuity(conn, relpath, theme, lesson_id, data):
+    conn.execute(
+        "INSERT OR REPLACE INTO continuity VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (relpath, data.get('lesson_id', lesson_id), data.get('theme_id', theme), data.get('schema_version'),
+         data.get('continuity_mode'), data.get('continuity_route'), _json(data)),
+    )
+
+
+def load_theme(conn, relpath, data):
+    conn.execute(
+        "INSERT OR REPLACE INTO themes VALUES (?, ?, ?, ?, ?, ?)",
+        (relpath, data.get('theme_id'), data.get('schema_version'), data.get('theme_status'),
+         data.get('rollout_stage'), _json(data)),
+    )
+
+
+def load_curated_sources(conn, relpath, data):
+    conn.executemany(
+        "INSERT OR REPLACE INTO curated_sources VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (relpath, source_id, source.get('author'), source.get('year'), source.get('title'), source.get('type'),
+             source.get('evidence_strength'), _json(source))
+            for source_id, source in (data.get('sources') or {}).items()
+        ],
+    )
+
+
+def iter_corpus_files():
+    """Yield (path, kind, loader) for every file the index covers."""
+    for theme, lesson_id, kind, path in iter_lesson_files(LESSONS_DIR, LOCALES + SIDECAR_KINDS):
+        if kind == 'evidence':
+            yield path, kind, lambda conn, rel, data, t=theme, l=lesson_id: load_evidence(conn, rel, t, l, data)
+        elif kind == 'continuity':
+            yield path, kind, lambda conn, rel, data, t=theme, l=lesson_id: load_continuity(conn, rel, t, l, data)
+        else:
+            yield path, 'lesson', lambda conn, rel, data, t=theme, l=lesson_id, k=kind: load_questions(conn, rel, t, l, k, data)
+    if os.path.isdir(THEMES_DIR):
+        for name in sorted(os.listdir(THEMES_DIR)):
+            if name.endswith('.meta.json'):
+                yield os.path.join(THEMES_DIR, name), 'theme', load_theme
+    if os.path.exists(CURATED_SOURCES_PATH):
+        yield CURATED_SOURCES_PATH, 'curated_sources', load_curated_sources
+
+
+def connect(db_path=DB_PATH):
+    return connect_index(db_path, SCHEMA, INDEX_SCHEMA_VERSION)
+
+
+def forget_rows(conn, relpath):
+    for table in ROW_TABLES:
+        conn.execute(f"DELETE FROM {table} WHERE file = ?", (relpath,))
+
+
+def update_index(conn, rebuild=False):
+    """Bring the index in line with the tree. Returns counts of loaded/unchanged/removed files."""
+    return sync_index(conn, iter_corpus_files(), forget_rows, rebuild)
+
+
+def run_query(conn, sql):
+    cursor = conn.execute(QUERIES.get(sql, sql))
+    columns = [column[0] for column in cursor.description or ()]
+    if columns:
+        print("\t".join(columns))
+    for row in cursor:
+        print("\t".join('' if value is None else str(value) for value in row))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the SQLite content index.")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite database path")
+    parser.add_argument('--rebuild', action='store_true', help="Reload every file instead of only changed ones")
+    parser.add_argument('--query', metavar='SQL', help=f"SQL to run after updating, or one of: {', '.join(QUERIES)}")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect(os.path.abspath(args.db))
+    started = time.perf_counter()
+    counts = update_index(conn, args.rebuild)
+    seconds = time.perf_counter() - started
+    print(f"✅ Content index {args.db}: {counts['loaded']} loaded, {counts['unchanged']} unchanged, "
+          f"{counts['removed']} removed in {seconds:.2f}s", file=sys.stderr)
+    if args.query:
+        run_query(conn, args.query)
+    conn.close()
+    return 1 if counts['errors'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
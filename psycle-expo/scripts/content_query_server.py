@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Local HTTP query service over lesson questions and curated sources.
+
+Loads every lesson locale file and data/curated_sources.json into in-memory
+indexes once, then answers lookups from those indexes. A background thread
+stats the corpus every --reload-interval seconds and reloads only the files
+whose mtime or size changed.
+
+Endpoints (all JSON, GET):
+  /sources                      source_id -> question count
+  /source/<source_id>           questions, themes and locales citing a source, plus its registry entry
+  /question/<id>                the question in every locale
+  /search?q=...&locale=ja&limit=20
+                                question, choices and explanation fields containing every query term,
+                                matched like scripts/lesson_search_index.py (NFKC, words, CJK bigrams)
+  /health                       file/question counts and last reload time
+
+Usage:
+  python3 scripts/content_query_server.py --port 8765
+  curl 'http://127.0.0.1:8765/search?q=反芻&locale=ja'
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from lesson_corpus import APP_ROOT, DATA_DIR, LESSONS_DIR, LOCALES, iter_lesson_files
+from lesson_search_index import contains_runs, field_texts, query_runs, snippet, tokenize
+
+CURATED_SOURCES_PATH = os.path.join(DATA_DIR, 'curated_sources.json')
+DEFAULT_LIMIT = 20
+
+
+class ContentIndex:
+    """In-memory indexes keyed by question id, source_id and search term.
+
+    Search terms come from lesson_search_index.tokenize, so /search matches
+    exactly what `lesson_search_index.py <query>` finds.
+
+    Each locale file's documents are tracked so a changed file can be
+    unindexed and reloaded on its own.
+    """
+
+    def __init__(self, lessons_dir=LESSONS_DIR, curated_path=CURATED_SOURCES_PATH):
+        self.lessons_dir = lessons_dir
+        self.curated_path = curated_path
+        self.lock = threading.RLock()
+        self.file_state = {}      # path -> (mtime_ns, size)
+        self.file_docs = {}       # path -> [(id, locale)]
+        self.docs = {}            # (id, locale) -> {'item', 'theme', 'lesson_id', 'file', 'fields', 'terms'}
+        self.by_id = {}           # id -> {locale: doc key}
+        self.by_source = {}       # source_id -> {(id, locale)}
+        self.postings = {}        # term -> {(id, locale)}
+        self.curated = {}
+        self.loaded_at = None
+
+    def corpus_files(self):
+        files = {path: ('lesson', theme, lesson_id, locale)
+                 for theme, lesson_id, locale, path in iter_lesson_files(self.lessons_dir, LOCALES)}
+        if os.path.exists(self.curated_path):
+            files[self.curated_path] = ('curated', None, None, None)
+        return files
+
+    def refresh(self):
+        """Reload changed files and drop deleted ones. Returns the number of files touched."""
+        files = self.corpus_files()
+        touched = 0
+        for path in set(self.file_state) - set(files):
+            with self.lock:
+                self._unindex_file(path)
+                self.file_state.pop(path, None)
+            touched += 1
+        for path, (kind, theme, lesson_id, locale) in files.items():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state = (stat.st_mtime_ns, stat.st_size)
+            if self.file_state.get(path) == state:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, UnicodeDecodeError, json.JSONDecodeError):
+                # Likely caught mid-write; retry on the next poll.
+                continue
+            with self.lock:
+                if kind == 'curated':
+                    self.curated = data.get('sources', {})
+                else:
+                    self._unindex_file(path)
+                    self._index_file(path, theme, lesson_id, locale, data)
+                self.file_state[path] = state
+            touched += 1
+        if touched or self.loaded_at is None:
+            self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        return touched
+
+    def _index_file(self, path, theme, lesson_id, locale, data):
+        keys = []
+        for item in data:
+            if not isinstance(item, dict) or not item.get('id'):
+                continue
+            key = (item['id'], locale)
+            fields = sorted((field, text, tokenize(text)) for field, text in field_texts(item))
+            terms = set().union(*(field_terms for _field, _text, field_terms in fields))
+            self.docs[key] = {'item': item, 'theme': theme, 'lesson_id': lesson_id,
+                              'file': os.path.relpath(path, APP_ROOT), 'fields': fields, 'terms': terms}
+            self.by_id.setdefault(item['id'], {})[locale] = key
+            self.by_source.setdefault(item.get('source_id', 'N/A'), set()).add(key)
+            for term in terms:
+                self.postings.setdefault(term, set()).add(key)
+            keys.append(key)
+        self.file_docs[path] = keys
+
+    def _unindex_file(self, path):
+        for key in self.file_docs.pop(path, ()):
+            doc = self.docs.pop(key, None)
+            if doc is None:
+                continue
+            item_id, locale = key
+            locales = self.by_id.get(item_id, {})
+            locales.pop(locale, None)
+            if not locales:
+                self.by_id.pop(item_id, None)
+            source_id = doc['item'].get('source_id', 'N/A')
+            self._discard(self.by_source, source_id, key)
+            for term in doc['terms']:
+                self._discard(self.postings, term, key)
+
+    @staticmethod
+    def _discard(index, name, key):
+        members = index.get(name)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del index[name]
+
+    def sources(self):
+        with self.lock:
+            counts = {source_id: len({item_id for item_id, _locale in keys}) for source_id, keys in self.by_source.items()}
+        return [{'source_id': source_id, 'questions': count}
+                for source_id, count in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+    def source(self, source_id):
+        with self.lock:
+            keys = self.by_source.get(source_id)
+            if not keys and source_id not in self.curated:
+                return None
+            keys = keys or set()
+            return {
+                'source_id': source_id,
+                'curated': self.curated.get(source_id),
+                'questions': sorted({item_id for item_id, _locale in keys}),
+                'themes': sorted({self.docs[key]['theme'] for key in keys}),
+                'locales': [locale for locale in LOCALES if any(key[1] == locale for key in keys)],
+            }
+
+    def question(self, item_id):
+        with self.lock:
+            locales = self.by_id.get(item_id)
+            if not locales:
+                return None
+            return {
+                'id': item_id,
+                'locales': {locale: dict(self.docs[key]['item'], _file=self.docs[key]['file'])
+                            for locale, key in sorted(locales.items(), key=lambda kv: LOCALES.index(kv[0]))},
+            }
+
+    def search(self, query, locale=None, limit=DEFAULT_LIMIT):
+        """Fields containing every query term, one result per (id, locale, field).
+
+        Postings narrow the candidates to questions holding every term; each
+        field is then checked on its own, like the per-field documents of
+        lesson_search_index.search.
+        """
+        terms = tokenize(query, query=True)
+        if not terms:
+            return []
+        runs = query_runs(query)
+        with self.lock:
+            ordered = sorted(terms, key=lambda term: len(self.postings.get(term, ())))
+            candidates = set(self.postings.get(ordered[0], ()))
+            for term in ordered[1:]:
+                if not candidates:
+                    break
+                candidates &= self.postings.get(term, set())
+            results = []
+            for key in sorted(candidates):
+                if locale and key[1] != locale:
+                    continue
+                doc = self.docs[key]
+                for field, text, field_terms in doc['fields']:
+                    if not terms <= field_terms or not contains_runs(text, runs):
+                        continue
+                    results.append({'id': key[0], 'locale': key[1], 'field': field, 'theme': doc['theme'],
+                                    'source_id': doc['item'].get('source_id'), 'snippet': snippet(text, query)})
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def health(self):
+        with self.lock:
+            return {'files': len(self.file_state), 'questions': len(self.by_id), 'documents': len(self.docs),
+                    'sources': len(self.by_source), 'loaded_at': self.loaded_at}
+
+
+def make_handler(index):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            started = time.perf_counter()
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+            status, body = 200, None
+            if parts == ['sources']:
+                body = index.sources()
+            elif len(parts) == 2 and parts[0] == 'source':
+                body = index.source(parts[1])
+            elif len(parts) == 2 and parts[0] == 'question':
+                body = index.question(parts[1])
+            elif parts == ['search']:
+                try:
+                    limit = int(params.get('limit', [DEFAULT_LIMIT])[0])
+                except ValueError:
+                    limit = DEFAULT_LIMIT
+                body = index.search(params.get('q', [''])[0], params.get('locale', [None])[0], limit)
+            elif parts in ([], ['health']):
+                body = index.health()
+            else:
+                status, body = 404, {'error': f"Unknown endpoint: {url.path}"}
+            if body is None:
+                status, body = 404, {'error': 'Not found'}
+            payload = json.dumps(body, ensure_ascii=False, indent=2).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('X-Elapsed-Ms', f"{(time.perf_counter() - started) * 1000:.3f}")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            if self.server.verbose:
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def watch(index, interval, stop):
+    while not stop.wait(interval):
+        touched = index.refresh()
+        if touched:
+            print(f"🔄 Reloaded {touched} changed file(s)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve lesson and source lookups over local HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--reload-interval', type=float, default=1.0, help="Seconds between change polls (0 disables hot reload)")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    index = ContentIndex()
+    started = time.perf_counter()
+    index.refresh()
+    health = index.health()
+    print(f"✅ Indexed {health['documents']} documents from {health['files']} files "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    stop = threading.Event()
+    if args.reload_interval > 0:
+        threading.Thread(target=watch, args=(index, args.reload_interval, stop), daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+    server.verbose = args.verbose
+    print(f"🚀 Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
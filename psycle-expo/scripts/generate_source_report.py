@@ -1,38 +1,317 @@
+import argparse
+import contextlib
+import csv
+import io
 import json
 import os
 
-DATA_DIR = '/Users/mashitashinji/dev/psych-duo-packs/psycle-expo/data/lessons'
-FILES = ['health.json', 'study.json', 'money.json', 'social.json']
+import build_content_index as content_index
+from lesson_corpus import APP_ROOT, LESSONS_DIR, LOCALES, split_lesson_filename
 
-def generate_report():
-    report = "# Content Source Verification Report\n\n"
-    report += "This report lists the academic source for every generated question to ensure scientific validity.\n\n"
-    
-    for filename in FILES:
-        filepath = os.path.join(DATA_DIR, filename)
-        if not os.path.exists(filepath):
+DATA_DIR = LESSONS_DIR
+OUTPUT_DIR = os.path.join(APP_ROOT, 'docs', '_reports')
+REPORT_BASENAME = 'source_verification_report'
+ROW_FIELDS = ('id', 'theme', 'locale', 'source_id', 'evidence_grade', 'question')
+QUESTION_PREFIX_CHARS = 50
+TOP_SOURCES = 20
+
+def write_section(out, filename, data):
+    out.write(f"## {filename} ({len(data)} Questions)\n\n")
+    out.write("| ID | Question (Stem) | Source ID (Theory/Researcher) |\n")
+    out.write("| :--- | :--- | :--- |\n")
+
+    for item in data:
+        q_text = item.get('question', 'N/A')[:QUESTION_PREFIX_CHARS] + "..."
+        source = item.get('source_id', 'N/A')
+        item_id = item.get('id', 'N/A')
+        out.write(f"| `{item_id}` | {q_text} | **{source}** |\n")
+
+    out.write("\n")
+
+def placeholders(values):
+    return ', '.join('?' for _ in values)
+
+def report_files(conn, files=None):
+    """Indexed lesson locale files (APP_ROOT-relative) in lesson/locale order, optionally limited to `files`."""
+    found = []
+    for (path,) in conn.execute("SELECT path FROM files WHERE kind = 'lesson'"):
+        parsed = split_lesson_filename(os.path.basename(path))
+        if parsed is not None and parsed[1] in LOCALES:
+            found.append((parsed[0], LOCALES.index(parsed[1]), path))
+    paths = [path for _lesson, _locale, path in sorted(found)]
+    if files is None:
+        return paths
+    wanted = {os.path.relpath(os.path.abspath(path), APP_ROOT) for path in files}
+    return [path for path in paths if path in wanted]
+
+def file_items(conn, path):
+    """Question rows of one indexed file as dicts, in file order."""
+    return [
+        {'id': item_id, 'question': question, 'source_id': source_id}
+        for item_id, question, source_id in conn.execute(
+            "SELECT COALESCE(id, 'N/A'), COALESCE(question, 'N/A'), COALESCE(source_id, 'N/A') "
+            "FROM questions WHERE file = ? ORDER BY position", (path,))
+    ]
+
+def iter_rows(conn, paths):
+    """Yield ROW_FIELDS tuples in report order."""
+    for path in paths:
+        yield from conn.execute(
+            "SELECT COALESCE(id, 'N/A'), theme, locale, COALESCE(source_id, 'N/A'), COALESCE(evidence_grade, ''), "
+            f"SUBSTR(COALESCE(question, ''), 1, {QUESTION_PREFIX_CHARS}) FROM questions WHERE file = ? ORDER BY position",
+            (path,),
+        )
+
+def build_source_index(conn, paths, source_id=None):
+    """{source_id: {'questions', 'themes', 'locales', 'lessons', 'grades', 'rows'}} over the given files.
+
+    With `source_id`, only that source's entry is built.
+    """
+    index = {}
+    if not paths:
+        return index
+    only_source = "" if source_id is None else "AND COALESCE(source_id, 'N/A') = ? "
+    rows = conn.execute(
+        "SELECT COALESCE(source_id, 'N/A'), COUNT(*), json_group_array(DISTINCT COALESCE(id, 'N/A')), "
+        "json_group_array(DISTINCT theme), json_group_array(DISTINCT locale), json_group_array(DISTINCT lesson_id), "
+        "json_group_array(DISTINCT NULLIF(evidence_grade, '')) "
+        f"FROM questions WHERE file IN ({placeholders(paths)}) {only_source}GROUP BY 1",
+        paths + ([] if source_id is None else [source_id]),
+    )
+    for source_id, count, *groups in rows:
+        questions, themes, locales, lessons, grades = ({value for value in json.loads(group) if value} for group in groups)
+        index[source_id] = {
+            'questions': questions, 'themes': themes, 'locales': locales, 'lessons': lessons, 'grades': grades,
+            'rows': count,
+        }
+    return index
+
+def citation_key(citation):
+    """Stable identity for a citation: DOI, else PMID, else URL, else label."""
+    for field in ('doi', 'pmid', 'url', 'label'):
+        value = str(citation.get(field) or '').strip()
+        if value:
+            return f"{field}:{value.lower() if field == 'doi' else value}"
+    return None
+
+def load_evidence_index(conn, lesson_ids):
+    """Return ({lesson_id: [(citation_key, role)]}, {citation_key: citation + {lesson_id: role}}).
+
+    Citations are keyed once however many lessons' *.evidence.json cite them;
+    the role is kept per citing lesson, since lessons may cite the same paper
+    as primary or supporting evidence.
+    """
+    by_lesson = {}
+    citations = {}
+    lesson_ids = sorted(lesson_ids)
+    if not lesson_ids:
+        return by_lesson, citations
+    rows = conn.execute(
+        # c.doi is lowercased for lookups; show the DOI as written in the sidecar.
+        "SELECT c.lesson_id, c.role, COALESCE(TRIM(json_extract(e.data, '$.citations[' || c.position || '].doi')), c.doi), "
+        "c.pmid, c.url, c.label FROM citations c "
+        f"JOIN evidence e ON e.file = c.file WHERE c.lesson_id IN ({placeholders(lesson_ids)}) "
+        "ORDER BY e.file, c.position",
+        lesson_ids,
+    )
+    for lesson_id, role, doi, pmid, url, label in rows:
+        cited = by_lesson.setdefault(lesson_id, [])
+        key = citation_key({'doi': doi, 'pmid': pmid, 'url': url, 'label': label})
+        if key is None:
             continue
-            
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        report += f"## {filename} ({len(data)} Questions)\n\n"
-        report += "| ID | Question (Stem) | Source ID (Theory/Researcher) |\n"
-        report += "| :--- | :--- | :--- |\n"
-        
-        for item in data:
-            q_text = item.get('question', 'N/A')[:50] + "..."
-            source = item.get('source_id', 'N/A')
-            item_id = item.get('id', 'N/A')
-            report += f"| `{item_id}` | {q_text} | **{source}** |\n"
-        
-        report += "\n"
-        
-    return report
+        role = role or 'supporting'
+        if key not in citations:
+            citation = {'doi': doi or '', 'pmid': pmid or '', 'label': label or '', 'lessons': {}}
+            citation['ids'] = format_citation_ids(citation)
+            citations[key] = citation
+        citations[key]['lessons'].setdefault(lesson_id, role)
+        if (key, role) not in cited:
+            cited.append((key, role))
+    return by_lesson, citations
+
+def load_curated_sources(conn):
+    return {source_id: json.loads(data) for source_id, data in conn.execute("SELECT source_id, data FROM curated_sources")}
+
+def format_citation_ids(citation):
+    ids = []
+    if citation['doi']:
+        ids.append(f"doi:{citation['doi']}")
+    if citation['pmid']:
+        ids.append(f"PMID {citation['pmid']}")
+    return ', '.join(ids) or '—'
+
+def write_provenance(out, index, evidence_by_lesson, citations, curated):
+    """One row per source_id joined with the curated registry and the citing lessons' evidence."""
+    out.write(f"## Source Provenance ({len(index)} Sources)\n\n")
+    out.write("| Source ID | Registry | Evidence Grades | Lessons | Evidence Citations |\n")
+    out.write("| :--- | :--- | :--- | :--- | :--- |\n")
+    for source_id, source in sorted(index.items()):
+        registry = curated.get(source_id)
+        if registry:
+            registry_text = (f"{registry.get('author', '?')} ({registry.get('year', '?')}) "
+                             f"*{registry.get('title', '')}* · {registry.get('type', '?')} · {registry.get('evidence_strength', '?')}")
+        else:
+            registry_text = "⚠️ not in curated_sources.json"
+        cited_by_role = []
+        for lesson_id in sorted(source['lessons']):
+            for entry in evidence_by_lesson.get(lesson_id, ()):
+                if entry not in cited_by_role:
+                    cited_by_role.append(entry)
+        cited = '<br>'.join(
+            f"{role}: {citations[key]['label'] if citations[key]['ids'] == '—' else citations[key]['ids']}"
+            for key, role in cited_by_role
+        ) or '—'
+        grades = ', '.join(sorted(source['grades'])) or '—'
+        lessons = ', '.join(f"`{lesson_id}`" for lesson_id in sorted(source['lessons']))
+        out.write(f"| **{source_id}** | {registry_text} | {grades} | {lessons} | {cited} |\n")
+    out.write("\n")
+
+    out.write(f"### Citation Index ({len(citations)} Citations)\n\n")
+    out.write("| Citation | Role | Identifiers | Cited by Lessons |\n")
+    out.write("| :--- | :--- | :--- | :--- |\n")
+    for _key, citation in sorted(citations.items(), key=lambda kv: (kv[1]['label'], kv[0])):
+        roles = ', '.join(sorted(set(citation['lessons'].values())))
+        lessons = ', '.join(f"`{lesson_id}`" for lesson_id in sorted(citation['lessons']))
+        out.write(f"| {citation['label'] or '—'} | {roles} | {citation['ids']} | {lessons} |\n")
+    out.write("\n")
+
+def write_rows_json(path, conn, paths):
+    """Write question rows as a JSON array, one object per line, without materialising the list."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for i, row in enumerate(iter_rows(conn, paths)):
+            f.write(",\n" if i else "\n")
+            f.write(json.dumps(dict(zip(ROW_FIELDS, row)), ensure_ascii=False))
+        f.write("\n]\n")
+
+def write_rows_csv(path, conn, paths):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(ROW_FIELDS)
+        writer.writerows(iter_rows(conn, paths))
+
+def sorted_locales(locales):
+    return sorted(locales, key=lambda locale: (LOCALES.index(locale) if locale in LOCALES else len(LOCALES), locale))
+
+def write_source_index(out, index, top=TOP_SOURCES):
+    """Aggregate views over the inverted index, one line per source."""
+    ranked = sorted(index.items(), key=lambda kv: (-len(kv[1]['questions']), kv[0]))
+
+    out.write(f"## Source Index ({len(index)} Sources)\n\n")
+    out.write(f"### Top {min(top, len(ranked))} Sources\n\n")
+    out.write("| Source ID | Questions | Themes | Locales |\n")
+    out.write("| :--- | ---: | :--- | :--- |\n")
+    for source_id, source in ranked[:top]:
+        themes = ', '.join(sorted(source['themes']))
+        locales = ', '.join(sorted_locales(source['locales']))
+        out.write(f"| **{source_id}** | {len(source['questions'])} | {themes} | {locales} |\n")
+    out.write("\n")
+
+    used_once = [(source_id, source) for source_id, source in ranked if len(source['questions']) == 1]
+    out.write(f"### Sources Used Once ({len(used_once)})\n\n")
+    for source_id, source in sorted(used_once):
+        out.write(f"- **{source_id}**: `{next(iter(source['questions']))}`\n")
+    out.write("\n")
+
+    out.write("### Questions per Source\n\n")
+    out.write("| Source ID | Questions | Question IDs |\n")
+    out.write("| :--- | ---: | :--- |\n")
+    for source_id, source in sorted(index.items()):
+        ids = ', '.join(f"`{item_id}`" for item_id in sorted(source['questions']))
+        out.write(f"| **{source_id}** | {len(source['questions'])} | {ids} |\n")
+    out.write("\n")
+
+def write_report(out, conn, files=None):
+    """Stream the report for the indexed lesson files to `out`, one file at a time.
+
+    Everything is read from the content index (scripts/build_content_index.py),
+    so only files that changed since its last update were re-parsed.
+    Returns (paths, source_index).
+    """
+    paths = report_files(conn, files)
+
+    out.write("# Content Source Verification Report\n\n")
+    out.write("This report lists the academic source for every generated question to ensure scientific validity.\n\n")
+    for path in paths:
+        write_section(out, os.path.relpath(os.path.join(APP_ROOT, path), DATA_DIR), file_items(conn, path))
+
+    index = build_source_index(conn, paths)
+    write_source_index(out, index)
+    lesson_ids = {lesson_id for source in index.values() for lesson_id in source['lessons']}
+    evidence_by_lesson, citations = load_evidence_index(conn, lesson_ids)
+    write_provenance(out, index, evidence_by_lesson, citations, load_curated_sources(conn))
+    return paths, index
+
+def print_source(conn, source_id, files=None):
+    """Print one source's questions, themes and locales from the index. Returns False if it is not cited."""
+    source = build_source_index(conn, report_files(conn, files), source_id).get(source_id)
+    if source is None:
+        print(f"Source not found: {source_id}")
+        return False
+    print(f"{source_id}: {len(source['questions'])} questions ({source['rows']} locale rows)")
+    print(f"  themes:    {', '.join(sorted(source['themes']))}")
+    print(f"  locales:   {', '.join(sorted_locales(source['locales']))}")
+    print(f"  questions: {', '.join(sorted(source['questions']))}")
+    return True
+
+def generate_report(db_path=content_index.DB_PATH):
+    conn = content_index.connect(db_path)
+    try:
+        content_index.update_index(conn)
+        buffer = io.StringIO()
+        write_report(buffer, conn)
+        return buffer.getvalue()
+    finally:
+        conn.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write the content source verification report.")
+    parser.add_argument('files', nargs='*', help="Lesson JSON files (default: every data/lessons/*_units/*.<locale>.json)")
+    parser.add_argument('--out-dir', default=OUTPUT_DIR, help=f"Directory for {REPORT_BASENAME}.md/.json/.csv")
+    parser.add_argument('--formats', default='md,json,csv', help="Comma-separated subset of md, json, csv (md is always written)")
+    parser.add_argument('--source', metavar='SOURCE_ID', help="Print the questions, themes and locales for one source_id instead of writing the report")
+    parser.add_argument('--db', default=content_index.DB_PATH, help="Content index the report is read from")
+    parser.add_argument('--rebuild', action='store_true', help="Reload every file into the content index first")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    formats = {fmt.strip() for fmt in args.formats.split(',') if fmt.strip()}
+    conn = content_index.connect(os.path.abspath(args.db))
+    counts = content_index.update_index(conn, args.rebuild)
+    if args.source:
+        try:
+            found = print_source(conn, args.source, args.files or None)
+        finally:
+            conn.close()
+        return 1 if counts['errors'] or not found else 0
+    os.makedirs(args.out_dir, exist_ok=True)
+    base = os.path.join(args.out_dir, REPORT_BASENAME)
+    outputs = [fmt for fmt in ('md', 'json', 'csv') if fmt == 'md' or fmt in formats]
+    # Write next to the targets and swap them in only once every format is done,
+    # so a failed run leaves the previous report intact.
+    tmp_paths = {fmt: f"{base}.{fmt}.tmp" for fmt in outputs}
+    try:
+        with open(tmp_paths['md'], 'w', encoding='utf-8') as f:
+            paths, _index = write_report(f, conn, args.files or None)
+        if 'json' in tmp_paths:
+            write_rows_json(tmp_paths['json'], conn, paths)
+        if 'csv' in tmp_paths:
+            write_rows_csv(tmp_paths['csv'], conn, paths)
+    except BaseException:
+        for tmp_path in tmp_paths.values():
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+        raise
+    finally:
+        conn.close()
+    for fmt, tmp_path in tmp_paths.items():
+        os.replace(tmp_path, f"{base}.{fmt}")
+    written = ', '.join(f"{REPORT_BASENAME}.{fmt}" for fmt in outputs)
+    unreadable = f", {counts['errors']} unreadable" if counts['errors'] else ''
+    print(f"✅ Report generated in: {args.out_dir} ({written}; {len(paths)} lesson files, "
+          f"{counts['loaded']} re-indexed, {counts['unchanged']} unchanged{unreadable})")
+    return 1 if counts['errors'] else 0
 
 if __name__ == "__main__":
-    report_content = generate_report()
-    output_path = '/Users/mashitashinji/.gemini/antigravity/brain/d4a58a6a-6c36-436f-a648-d4d7a2f30638/source_verification_report.md'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(report_content)
-    print(f"✅ Report generated at: {output_path}")
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_ROOT = os.path.dirname(SCRIPTS_DIR)
+DATA_DIR = os.path.join(APP_ROOT, 'data')
+LESSONS_DIR = os.path.join(DATA_DIR, 'lessons')
+CACHE_DIR = os.path.join(APP_ROOT, '.cache')
+
+LOCALES = ('ja', 'en', 'de', 'es', 'fr', 'ko', 'pt', 'zh')
+SIDECAR_KINDS = ('evidence', 'continuity')
+
+# Bookkeeping tables every incremental index shares; tools add their own row tables.
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, kind TEXT, mtime_ns INTEGER, size INTEGER, sha256 TEXT);
+"""
+
+
+def split_lesson_filename(filename):
+    """Split `mental_l01.ja.json` into ('mental_l01', 'ja').
+
+    The second value is a locale code or a sidecar kind. Returns None for
+    files that do not follow the `<lesson_id>.<kind>.json` layout.
+    """
+    if not filename.endswith('.json'):
+        return None
+    parts = filename[:-len('.json')].split('.')
+    if len(parts) != 2:
+        return None
+    lesson_id, kind = parts
+    if kind not in LOCALES and kind not in SIDECAR_KINDS:
+        return None
+    return lesson_id, kind
+
+
+def iter_unit_dirs(lessons_dir=LESSONS_DIR):
+    """Yield (theme_id, path) for every `<theme>_units` directory, sorted."""
+    if not os.path.isdir(lessons_dir):
+        return
+    for name in sorted(os.listdir(lessons_dir)):
+        path = os.path.join(lessons_dir, name)
+        if name.endswith('_units') and os.path.isdir(path):
+            yield name[:-len('_units')], path
+
+
+def iter_lesson_files(lessons_dir=LESSONS_DIR, kinds=LOCALES):
+    """Yield (theme_id, lesson_id, kind, path) for lesson files, sorted.
+
+    One directory scan per theme; `kinds` filters on locale or sidecar kind.
+    """
+    for theme_id, unit_dir in iter_unit_dirs(lessons_dir):
+        with os.scandir(unit_dir) as entries:
+            names = sorted(entry.name for entry in entries if entry.is_file())
+        for name in names:
+            parsed = split_lesson_filename(name)
+            if parsed is None or parsed[1] not in kinds:
+                continue
+            yield theme_id, parsed[0], parsed[1], os.path.join(unit_dir, name)
+
+
+def load_script(filename):
+    """Import a script from this directory whose file name is not a valid module name.
+
+    worktree-status-buckets.py is hyphenated, so benchmarks and tests load it by path.
+    """
+    name = os.path.splitext(filename)[0].replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_json_cache(cache_path, version):
+    """Return the cached payload dict, or None when missing, unreadable or from another version."""
+    if cache_path is None or not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or cache.get('version') != version:
+        return None
+    return cache
+
+
+def save_json_cache(cache_path, version, payload):
+    """Write `payload` plus `version` via a temp file, so readers never see a partial cache."""
+    if cache_path is None:
+        return
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(payload, version=version), f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def connect_index(db_path, schema, version):
+    """Open an incremental SQLite index, dropping every table when `version` changed."""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    stored = None
+    if conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='meta'").fetchone():
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        stored = row and row[0]
+    if stored != str(version):
+        for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall():
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.executescript(INDEX_SCHEMA + schema)
+    conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)", (str(version),))
+    conn.commit()
+    return conn
+
+
+def sync_index(conn, corpus, forget_rows, rebuild=False):
+    """Reload changed files into an index opened with connect_index. Returns counts.
+
+    `corpus` yields (path, kind, loader); loader(conn, relpath, data) inserts the
+    rows for one parsed JSON file and forget_rows(conn, relpath) deletes them.
+    Files whose mtime/size or sha256 match the previous run are skipped.
+    """
+    counts = {'loaded': 0, 'unchanged': 0, 'removed': 0, 'errors': 0}
+    known = {row[0]: row[1:] for row in conn.execute("SELECT path, mtime_ns, size, sha256 FROM files")}
+    seen = set()
+
+    def forget(relpath):
+        forget_rows(conn, relpath)
+        conn.execute("DELETE FROM files WHERE path = ?", (relpath,))
+
+    with conn:
+        if rebuild:
+            for relpath in known:
+                forget(relpath)
+            known = {}
+        for path, kind, loader in corpus:
+            relpath = os.path.relpath(path, APP_ROOT)
+            seen.add(relpath)
+            stat = os.stat(path)
+            previous = known.get(relpath)
+            if previous and previous[0] == stat.st_mtime_ns and previous[1] == stat.st_size:
+                counts['unchanged'] += 1
+                continue
+            with open(path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if previous and previous[2] == digest:
+                conn.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", (stat.st_mtime_ns, stat.st_size, relpath))
+                counts['unchanged'] += 1
+                continue
+            forget(relpath)
+            try:
+                data = json.loads(raw.decode('utf-8'))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                print(f"Error decoding JSON: {relpath}", file=sys.stderr)
+                counts['errors'] += 1
+                continue
+            loader(conn, relpath, data)
+            conn.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?)", (relpath, kind, stat.st_mtime_ns, stat.st_size, digest))
+            counts['loaded'] += 1
+        for relpath in set(known) - seen:
+            forget(relpath)
+            counts['removed'] += 1
+    return counts
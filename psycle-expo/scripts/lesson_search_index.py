@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""On-disk full-text index over lesson question, choices and explanation text.
+
+Every locale file under data/lessons/*_units is tokenised into
+.cache/lesson_search.sqlite: runs of CJK script (ja/zh/ko content) become
+single characters plus character bigrams, everything else becomes casefolded
+word tokens. Each run re-indexes only files whose mtime/size and hash changed.
+
+Usage:
+  python3 scripts/lesson_search_index.py 反芻思考
+  python3 scripts/lesson_search_index.py --locale en --field question "implementation intention"
+  python3 scripts/lesson_search_index.py --duplicates
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+import unicodedata
+
+from lesson_corpus import CACHE_DIR, LESSONS_DIR, LOCALES, connect_index, iter_lesson_files, sync_index
+
+DB_PATH = os.path.join(CACHE_DIR, 'lesson_search.sqlite')
+FIELDS = ('question', 'choices', 'explanation')
+DEFAULT_LIMIT = 20
+
+# Bump when tokenisation changes; the index is rebuilt from scratch.
+INDEX_VERSION = 2
+
+# Han, Hiragana, Katakana (incl. prolonged sound mark), Hangul syllables and jamo.
+CJK_RUN = r'[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯ᄀ-ᇿ㄰-㆏ｦ-ﾟ]+'
+TOKEN_RE = re.compile(rf'({CJK_RUN})|(\w+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY, file TEXT NOT NULL, question_id TEXT NOT NULL, locale TEXT NOT NULL,
+    field TEXT NOT NULL, text TEXT NOT NULL, norm_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_file ON docs (file);
+CREATE INDEX IF NOT EXISTS docs_duplicates ON docs (field, locale, norm_hash);
+CREATE TABLE IF NOT EXISTS terms (term TEXT NOT NULL, doc_id INTEGER NOT NULL, PRIMARY KEY (term, doc_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS terms_doc ON terms (doc_id);
+"""
+
+
+def normalize(text):
+    return unicodedata.normalize('NFKC', text).casefold()
+
+
+def tokenize(text, query=False):
+    """Set of terms: CJK runs as character bigrams, other runs as words.
+
+    Indexed text also gets every single CJK character, so one-character
+    queries match; a query run longer than one character uses bigrams only.
+    """
+    terms = set()
+    for cjk, word in TOKEN_RE.findall(normalize(text)):
+        if cjk:
+            if len(cjk) == 1 or not query:
+                terms.update(cjk)
+            terms.update(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        elif word:
+            terms.add(word)
+    return terms
+
+
+def query_runs(query):
+    """CJK runs of a query, which a match must contain verbatim."""
+    return re.findall(CJK_RUN, normalize(query))
+
+
+def contains_runs(text, runs):
+    """True if the normalised text contains every run; bigram hits alone can be scattered through it."""
+    normalized = normalize(text)
+    return all(run in normalized for run in runs)
+
+
+def field_texts(item):
+    for field in FIELDS:
+        value = item.get(field)
+        if isinstance(value, list):
+            value = "\n".join(str(part) for part in value)
+        if value:
+            yield field, str(value)
+
+
+def connect(db_path=DB_PATH):
+    return connect_index(db_path, SCHEMA, INDEX_VERSION)
+
+
+def forget_rows(conn, relpath):
+    conn.execute("DELETE FROM terms WHERE doc_id IN (SELECT doc_id FROM docs WHERE file = ?)", (relpath,))
+    conn.execute("DELETE FROM docs WHERE file = ?", (relpath,))
+
+
+def index_file(conn, relpath, locale, data):
+    for item in data:
+        if not isinstance(item, dict) or not item.get('id'):
+            continue
+        for field, text in field_texts(item):
+            norm = normalize(text)
+            cursor = conn.execute(
+                "INSERT INTO docs (file, question_id, locale, field, text, norm_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                (relpath, item['id'], locale, field, text, hashlib.sha1(" ".join(norm.split()).encode('utf-8')).hexdigest()),
+            )
+            conn.executemany("INSERT OR IGNORE INTO terms VALUES (?, ?)",
+                             [(term, cursor.lastrowid) for term in tokenize(text)])
+
+
+def iter_locale_files():
+    """Yield (path, locale, loader) for every lesson locale file."""
+    for _theme, _lesson_id, locale, path in iter_lesson_files(LESSONS_DIR, LOCALES):
+        yield path, locale, lambda conn, rel, data, l=locale: index_file(conn, rel, l, data)
+
+
+def update_index(conn, rebuild=False):
+    """Re-index changed locale files and drop deleted ones. Returns counts."""
+    return sync_index(conn, iter_locale_files(), forget_rows, rebuild)
+
+
+def search(conn, query, locale=None, field=None, limit=DEFAULT_LIMIT):
+    """Documents containing every query term. Each CJK run of the query is then
+    checked as a substring, since bigram matches alone can be scattered
+    through the text."""
+    terms = sorted(tokenize(query, query=True))
+    if not terms:
+        return []
+    sql = (f"SELECT d.question_id, d.locale, d.field, d.text FROM docs d "
+           f"JOIN (SELECT doc_id FROM terms WHERE term IN ({', '.join('?' for _ in terms)}) "
+           f"GROUP BY doc_id HAVING COUNT(*) = ?) hits ON hits.doc_id = d.doc_id")
+    params = terms + [len(terms)]
+    filters = []
+    if locale:
+        filters.append("d.locale = ?")
+        params.append(locale)
+    if field:
+        filters.append("d.field = ?")
+        params.append(field)
+    if filters:
+        sql += " WHERE " + " AND ".join(filters)
+    sql += " ORDER BY d.question_id, d.locale, d.field"
+
+    runs = query_runs(query)
+    results = []
+    for question_id, doc_locale, doc_field, text in conn.execute(sql, params):
+        if runs and not contains_runs(text, runs):
+            continue
+        results.append((question_id, doc_locale, doc_field, text))
+        if len(results) >= limit:
+            break
+    return results
+
+
+def duplicates(conn, field='question'):
+    """Groups of distinct question ids whose normalised `field` text is identical within a locale."""
+    rows = conn.execute(
+        "SELECT locale, GROUP_CONCAT(DISTINCT question_id), MIN(text) FROM docs WHERE field = ? "
+        "GROUP BY locale, norm_hash HAVING COUNT(DISTINCT question_id) > 1 ORDER BY locale",
+        (field,),
+    ).fetchall()
+    return [(locale, sorted(ids.split(',')), text) for locale, ids, text in rows]
+
+
+def snippet(text, query, width=60):
+    flat = " ".join(text.split())
+    folded = normalize(flat)
+    positions = [folded.find(part) for part in normalize(query).split()]
+    position = min((p for p in positions if p >= 0), default=0)
+    start = max(0, position - 20)
+    return flat[start:start + width]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search lesson text across every locale.")
+    parser.add_argument('query', nargs='*', help="Search terms (all must match)")
+    parser.add_argument('--db', default=DB_PATH, help="SQLite index path")
+    parser.add_argument('--rebuild', action='store_true', help="Re-index every file instead of only changed ones")
+    parser.add_argument('--locale', choices=LOCALES, help="Limit results to one locale")
+    parser.add_argument('--field', choices=FIELDS, help="Limit results to one field")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--duplicates', action='store_true', help="List questions whose text is duplicated within a locale")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect(os.path.abspath(args.db))
+    started = time.perf_counter()
+    counts = update_index(conn, args.rebuild)
+    print(f"✅ Search index: {counts['loaded']} indexed, {counts['unchanged']} unchanged, "
+          f"{counts['removed']} removed in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    if args.duplicates:
+        groups = duplicates(conn, args.field or 'question')
+        for locale, ids, text in groups:
+            print(f"{locale}\t{', '.join(ids)}\t{' '.join(text.split())[:60]}")
+        return 1 if groups else 0
+
+    if args.query:
+        query = " ".join(args.query)
+        started = time.perf_counter()
+        results = search(conn, query, args.locale, args.field, args.limit)
+        for question_id, locale, field, text in results:
+            print(f"{question_id}\t{locale}\t{field}\t{snippet(text, query)}")
+        print(f"{len(results)} result(s) in {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    conn.close()
+    return 1 if counts['errors'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
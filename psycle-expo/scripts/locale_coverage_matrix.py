@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Lesson × locale coverage matrix for data/lessons.
+
+Scans each `<theme>_units` directory once and prints one row per lesson with
+the item count for every locale (ja is the base) plus whether the evidence
+and continuity sidecars exist. Cells whose id set differs from ja are marked
+with the number of missing (-) and extra (+) ids. Id lists are cached by
+mtime/size in .cache/, so reruns only re-read changed files.
+
+Usage:
+  python3 scripts/locale_coverage_matrix.py
+  python3 scripts/locale_coverage_matrix.py --theme mental --details
+  python3 scripts/locale_coverage_matrix.py --json > coverage.json
+  python3 scripts/locale_coverage_matrix.py --check   # exit 1 on gaps
+"""
+import argparse
+import json
+import os
+import sys
+
+from lesson_corpus import (APP_ROOT, CACHE_DIR, LESSONS_DIR, LOCALES, SIDECAR_KINDS, iter_unit_dirs, load_json_cache,
+                           save_json_cache, split_lesson_filename)
+
+BASE_LOCALE = 'ja'
+CACHE_PATH = os.path.join(CACHE_DIR, 'locale_coverage_ids.json')
+CACHE_VERSION = 1
+
+
+def read_ids(entry, cached):
+    """Return (ids, cache_entry) for a locale file, reusing the cached list when stat matches."""
+    stat = entry.stat()
+    if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+        return cached['ids'], cached
+    try:
+        with open(entry.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        ids = [item.get('id') for item in data if isinstance(item, dict)]
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError, AttributeError):
+        ids = None
+    return ids, {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'ids': ids}
+
+
+def scan(lessons_dir=LESSONS_DIR, themes=None, cache_path=CACHE_PATH):
+    """Build {theme: {lesson_id: {kind: ids list | True}}} with one scandir per theme."""
+    cache = (load_json_cache(cache_path, CACHE_VERSION) or {}).get('entries', {})
+    # A theme-limited run keeps the other themes' cached lists.
+    entries = dict(cache) if themes else {}
+    matrix = {}
+    for theme, unit_dir in iter_unit_dirs(lessons_dir):
+        if themes and theme not in themes:
+            continue
+        lessons = matrix.setdefault(theme, {})
+        with os.scandir(unit_dir) as dir_entries:
+            for entry in dir_entries:
+                parsed = split_lesson_filename(entry.name)
+                if parsed is None or not entry.is_file():
+                    continue
+                lesson_id, kind = parsed
+                cells = lessons.setdefault(lesson_id, {})
+                if kind in SIDECAR_KINDS:
+                    cells[kind] = True
+                    continue
+                key = os.path.relpath(entry.path, APP_ROOT)
+                cells[kind], entries[key] = read_ids(entry, cache.get(key))
+    save_json_cache(cache_path, CACHE_VERSION, {'entries': entries})
+    return matrix
+
+
+def compare(matrix):
+    """Return rows of (theme, lesson_id, {column: cell}) with set-based mismatch info."""
+    rows = []
+    for theme in sorted(matrix):
+        for lesson_id in sorted(matrix[theme]):
+            cells = matrix[theme][lesson_id]
+            base_ids = cells.get(BASE_LOCALE)
+            base = set(base_ids) if base_ids is not None else None
+            row = {}
+            for locale in LOCALES:
+                ids = cells.get(locale)
+                if locale not in cells:
+                    row[locale] = {'status': 'missing'}
+                elif ids is None:
+                    row[locale] = {'status': 'invalid'}
+                else:
+                    id_set = set(ids)
+                    cell = {'status': 'ok', 'count': len(ids)}
+                    if base is not None and id_set != base:
+                        cell.update(status='mismatch', missing=sorted(base - id_set), extra=sorted(id_set - base))
+                    if len(id_set) != len(ids):
+                        cell.update(status='mismatch', duplicates=len(ids) - len(id_set))
+                    row[locale] = cell
+            for kind in SIDECAR_KINDS:
+                row[kind] = {'status': 'ok' if cells.get(kind) else 'missing'}
+            rows.append((theme, lesson_id, row))
+    return rows
+
+
+def format_cell(cell):
+    status = cell['status']
+    if status == 'missing':
+        return '—'
+    if status == 'invalid':
+        return '⚠️ invalid'
+    if 'count' not in cell:
+        return '✓'
+    text = str(cell['count'])
+    if status == 'mismatch':
+        marks = []
+        if cell.get('missing'):
+            marks.append(f"-{len(cell['missing'])}")
+        if cell.get('extra'):
+            marks.append(f"+{len(cell['extra'])}")
+        if cell.get('duplicates'):
+            marks.append(f"dup {cell['duplicates']}")
+        text += f" ⚠️ {'/'.join(marks)}"
+    return text
+
+
+def print_matrix(rows, details=False):
+    columns = LOCALES + SIDECAR_KINDS
+    print("| Lesson | " + " | ".join(columns) + " |")
+    print("| :--- | " + " | ".join(':---:' for _ in columns) + " |")
+    for _theme, lesson_id, row in rows:
+        print(f"| `{lesson_id}` | " + " | ".join(format_cell(row[column]) for column in columns) + " |")
+    if details:
+        print()
+        for _theme, lesson_id, row in rows:
+            for column in columns:
+                cell = row[column]
+                if cell.get('missing'):
+                    print(f"- {lesson_id}.{column}: missing {', '.join(cell['missing'])}")
+                if cell.get('extra'):
+                    print(f"- {lesson_id}.{column}: extra {', '.join(cell['extra'])}")
+
+
+def has_gaps(rows):
+    return any(cell['status'] != 'ok' for _theme, _lesson, row in rows for cell in row.values())
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Print the lesson × locale coverage matrix.")
+    parser.add_argument('--theme', action='append', help="Limit to a theme (repeatable)")
+    parser.add_argument('--details', action='store_true', help="List missing and extra ids per cell")
+    parser.add_argument('--json', action='store_true', help="Print the matrix as JSON")
+    parser.add_argument('--check', action='store_true', help="Exit 1 when any cell is missing or mismatched")
+    parser.add_argument('--no-cache', action='store_true', help="Re-read every locale file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    matrix = scan(themes=set(args.theme or ()), cache_path=None if args.no_cache else CACHE_PATH)
+    rows = compare(matrix)
+    if args.json:
+        json.dump([{'theme': theme, 'lesson_id': lesson_id, 'cells': row} for theme, lesson_id, row in rows],
+                  sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_matrix(rows, args.details)
+    return 1 if args.check and has_gaps(rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
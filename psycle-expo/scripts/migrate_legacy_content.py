@@ -1,13 +1,38 @@
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
 import json
 import os
+import sqlite3
+import time
+import uuid
 
-DATA_DIR = '/Users/mashitashinji/dev/psych-duo-packs/psycle-expo/data/lessons'
+from lesson_corpus import APP_ROOT, CACHE_DIR, LESSONS_DIR, LOCALES, SIDECAR_KINDS, iter_lesson_files, split_lesson_filename
+
+DATA_DIR = LESSONS_DIR
 FILES_TO_MIGRATE = ['money.json', 'social.json']
 
-def migrate_item(item):
+# Bump when migrate_item changes so journaled files are processed again.
+MIGRATION_SCHEMA_VERSION = 1
+# Sidecar schema versions; bump with a new transform step to re-run the upgrade.
+CONTINUITY_SCHEMA_VERSION = 1
+EVIDENCE_SCHEMA_VERSION = 1
+CITATION_ID_FIELDS = ('doi', 'pmid', 'isbn', 'url')
+# Legacy fields with no new-schema home; kept in the salvage store instead of being lost.
+SALVAGE_FIELDS = ('real_example', 'action', 'fun_fact', 'tip', 'incorrect_feedback', 'emoji_hint')
+# Outside data/lessons so it never ships with content; not under .cache since it cannot be rebuilt.
+SALVAGE_PATH = os.path.join(APP_ROOT, '.salvage', 'legacy_salvage.sqlite')
+JOURNAL_PATH = os.path.join(CACHE_DIR, 'migrate_legacy_content.journal.ndjson')
+LEGACY_RENAMES = {'stem': 'question', 'answer_index': 'correct_index'}
+EXPLANATION_SOURCES = ('what', 'why', 'how')
+STREAM_CHUNK_SIZE = 1 << 16
+
+def migrate_item(item, verbose=True, salvage=None):
     # Check if it's a legacy item (has 'stem' but no 'question')
     if 'stem' in item and 'question' not in item:
-        print(f"Migrating ID: {item.get('id', 'unknown')}")
+        if verbose:
+            print(f"Migrating ID: {item.get('id', 'unknown')}")
         
         # 1. Map basic fields
         item['question'] = item['stem']
@@ -32,38 +57,470 @@ def migrate_item(item):
         # 4. Remove legacy fields to clean up
         for field in ['stem', 'answer_index', 'what', 'why', 'how', 'real_example', 'action', 'fun_fact', 'tip', 'incorrect_feedback', 'emoji_hint']:
             if field in item:
+                if salvage is not None and field in SALVAGE_FIELDS:
+                    salvage[field] = item[field]
                 del item[field]
                 
         return True
     return False
 
-def process_file(filename):
-    filepath = os.path.join(DATA_DIR, filename)
+def iter_json_array(f, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n':
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            fill()
+            continue
+        char = buf[pos]
+        if not started:
+            if char != '[':
+                raise ValueError("Expected a top-level JSON array")
+            started = True
+            pos += 1
+            continue
+        if char == ']':
+            return
+        if char == ',':
+            pos += 1
+            continue
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        # A number cut by the chunk boundary decodes early ("1." as 1), so a
+        # value only counts once a delimiter follows it.
+        if not eof and (end == len(buf) or buf[end] not in ' \t\r\n,]'):
+            fill()
+            continue
+        pos = end
+        yield value
+
+def summarize_change(before_keys, item, summary, salvage=True):
+    """Record how migrate_item reshaped one item into the dry-run summary counters."""
+    for field in before_keys:
+        if field in item:
+            continue
+        if field in LEGACY_RENAMES:
+            summary['renamed'][f"{field} → {LEGACY_RENAMES[field]}"] += 1
+        elif field in EXPLANATION_SOURCES:
+            summary['folded'][field] += 1
+        elif salvage and field in SALVAGE_FIELDS:
+            summary['salvaged'][field] += 1
+        else:
+            summary['dropped'][field] += 1
+    if 'explanation' not in before_keys:
+        summary['synthesised']['explanation'] += 1
+    summary['source_id'][item['source_id']] += 1
+    if 'type' not in before_keys:
+        summary['synthesised'][f"type={item['type']}"] += 1
+
+def format_counter(counter):
+    return ', '.join(f"{key} ×{count}" for key, count in counter.most_common())
+
+def dry_run_file(filepath, salvage=True):
+    """Stream a file through migrate_item in memory and print a per-field change summary."""
+    relpath = os.path.relpath(filepath, APP_ROOT)
     if not os.path.exists(filepath):
         print(f"File not found: {filepath}")
-        return
+        return 'missing', 0, 0
 
-    with open(filepath, 'r', encoding='utf-8') as f:
+    kind = kind_for(filepath)
+    if kind != 'lesson':
+        # Sidecars are single small objects; transform a fully decoded copy.
         try:
-            data = json.load(f)
-        except json.JSONDecodeError:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (UnicodeDecodeError, json.JSONDecodeError):
             print(f"Error decoding JSON: {filepath}")
-            return
+            return 'error', 0, 0
+        try:
+            _items, changed = TRANSFORMS[kind][0](data, [])
+        except (ValueError, TypeError, AttributeError) as exc:
+            print(f"❌ Error upgrading {relpath}: {exc}")
+            return 'error', 0, 0
+        if changed:
+            print(f"🔍 {relpath}: {kind} sidecar would be upgraded")
+        return ('migrated' if changed else 'unchanged'), 1, changed
 
+    summary = {key: Counter() for key in ('renamed', 'folded', 'salvaged', 'dropped', 'synthesised', 'source_id')}
+    item_count = 0
     migrated_count = 0
-    for item in data:
-        if migrate_item(item):
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for item in iter_json_array(f):
+                item_count += 1
+                before_keys = list(item) if isinstance(item, dict) else []
+                if isinstance(item, dict) and migrate_item(item, verbose=False):
+                    migrated_count += 1
+                    summarize_change(before_keys, item, summary, salvage)
+    except (UnicodeDecodeError, ValueError):
+        print(f"Error decoding JSON: {filepath}")
+        return 'error', item_count, 0
+
+    if not migrated_count:
+        print(f"No items needed migration in {relpath}")
+        return 'unchanged', item_count, 0
+    print(f"🔍 {relpath}: {migrated_count}/{item_count} items would migrate")
+    if summary['renamed']:
+        print(f"   renamed      {format_counter(summary['renamed'])}")
+    if summary['folded']:
+        print(f"   folded       {format_counter(summary['folded'])} → explanation")
+    if summary['salvaged']:
+        print(f"   salvaged     {format_counter(summary['salvaged'])}")
+    if summary['dropped']:
+        print(f"   dropped      {format_counter(summary['dropped'])}")
+    if summary['synthesised']:
+        print(f"   synthesised  {format_counter(summary['synthesised'])}")
+    print(f"   source_id    {format_counter(summary['source_id'])}")
+    return 'migrated', item_count, migrated_count
+
+def load_journal(journal_path):
+    """Return {relpath: last file record} from the append-only journal."""
+    entries = {}
+    if not os.path.exists(journal_path):
+        return entries
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line; ignore it.
+                continue
+            if record.get('type') == 'file':
+                entries[record['file']] = record
+    return entries
+
+def append_journal(journal_path, record):
+    if journal_path is None:
+        return
+    os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+    with open(journal_path, 'a+b') as f:
+        # Start a fresh line after a record truncated by a crash, so this one stays readable.
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = b"\n" + line
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+def is_journaled(entry, schema_version, stat=None, digest=None):
+    if entry is None or entry.get('schema_version') != schema_version:
+        return False
+    if digest is not None:
+        return entry.get('sha256') == digest
+    return entry.get('mtime_ns') == stat.st_mtime_ns and entry.get('size') == stat.st_size
+
+def detect_json_layout(text):
+    """Return (indent, trailing_newline) so rewrites keep the file's existing formatting."""
+    indent = 2
+    for line in text.splitlines()[1:]:
+        stripped = line.lstrip(' ')
+        if stripped:
+            indent = (len(line) - len(stripped)) or 2
+            break
+    return indent, text.endswith('\n')
+
+def write_json_atomic(filepath, data, indent=2, trailing_newline=False):
+    """Write via a temp file so a crash never leaves a half-written lesson. Returns the sha256."""
+    payload = json.dumps(data, ensure_ascii=False, indent=indent)
+    if trailing_newline:
+        payload += "\n"
+    payload = payload.encode('utf-8')
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, filepath)
+    return hashlib.sha256(payload).hexdigest()
+
+def migrate_lesson(data, salvaged):
+    """Transform for lesson locale arrays. Returns (item_count, changed_count).
+
+    Dropped SALVAGE_FIELDS values are appended to `salvaged` as (question_id, fields).
+    """
+    if not isinstance(data, list):
+        raise ValueError("Expected a top-level JSON array")
+    migrated_count = 0
+    for index, item in enumerate(data):
+        fields = {}
+        # Files are processed concurrently, so per-item progress lines would interleave.
+        if isinstance(item, dict) and migrate_item(item, verbose=False, salvage=fields):
             migrated_count += 1
+            if fields:
+                salvaged.append((item.get('id') or f"#{index}", fields))
+    return len(data), migrated_count
+
+def upgrade_continuity(data, _salvaged):
+    """Transform for *.continuity.json: apply CONTINUITY_UPGRADES up to CONTINUITY_SCHEMA_VERSION.
+
+    Version 1 is the first versioned schema, so a file without a usable
+    schema_version is an error to fix by hand (see scripts/lib/continuity-metadata.js),
+    never stamped as current.
+    """
+    version = data.get('schema_version')
+    if not isinstance(version, int) or version < 1:
+        raise ValueError("continuity sidecar has no schema_version >= 1")
+    if version >= CONTINUITY_SCHEMA_VERSION:
+        return 1, 0
+    for step in range(version, CONTINUITY_SCHEMA_VERSION):
+        CONTINUITY_UPGRADES[step](data)
+    data['schema_version'] = CONTINUITY_SCHEMA_VERSION
+    return 1, 1
+
+# schema_version n -> function upgrading a continuity dict in place to n + 1.
+CONTINUITY_UPGRADES = {}
+
+def normalize_citation(citation, default_role=None):
+    normalized = dict(citation)
+    for field in CITATION_ID_FIELDS:
+        value = normalized.get(field)
+        if isinstance(value, int):
+            value = str(value)
+        if isinstance(value, str):
+            normalized[field] = value.strip()
+    if default_role:
+        normalized.setdefault('role', default_role)
+    return normalized
+
+def upgrade_evidence(data, _salvaged):
+    """Transform for *.evidence.json: normalise identifier fields the way
+    scripts/lib/evidence-parser.js reads them.
+
+    A legacy single `citation` stays where it is. evidence-parser.js reads both
+    fields, and several lints read only `citation`, so copying it into
+    `citations[]` would count it twice.
+    """
+    before = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    if isinstance(data.get('citation'), dict):
+        data['citation'] = normalize_citation(data['citation'])
+    citations = data.get('citations')
+    if isinstance(citations, list):
+        data['citations'] = [normalize_citation(c, 'supporting') if isinstance(c, dict) else c for c in citations]
+    changed = json.dumps(data, sort_keys=True, ensure_ascii=False) != before
+    return int(isinstance(data.get('citation'), dict)) + len(data.get('citations') or []), int(changed)
+
+# kind -> (transform, schema version recorded in the journal)
+TRANSFORMS = {
+    'lesson': (migrate_lesson, MIGRATION_SCHEMA_VERSION),
+    'continuity': (upgrade_continuity, CONTINUITY_SCHEMA_VERSION),
+    'evidence': (upgrade_evidence, EVIDENCE_SCHEMA_VERSION),
+}
+
+def kind_for(filepath):
+    parsed = split_lesson_filename(os.path.basename(filepath))
+    if parsed and parsed[1] in SIDECAR_KINDS:
+        return parsed[1]
+    return 'lesson'
+
+def open_salvage(salvage_path):
+    os.makedirs(os.path.dirname(salvage_path), exist_ok=True)
+    conn = sqlite3.connect(salvage_path, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS salvage ("
+        " question_id TEXT NOT NULL,"
+        " file TEXT NOT NULL,"
+        " fields TEXT NOT NULL,"
+        " run_id TEXT,"
+        " salvaged_at TEXT,"
+        " PRIMARY KEY (question_id, file)"
+        ") WITHOUT ROWID"
+    )
+    return conn
+
+def save_salvage(salvage_path, relpath, salvaged, run_id):
+    """Commit salvaged legacy fields before the lesson file that held them is rewritten."""
+    if salvage_path is None or not salvaged:
+        return
+    salvaged_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    conn = open_salvage(salvage_path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO salvage (question_id, file, fields, run_id, salvaged_at) VALUES (?, ?, ?, ?, ?)",
+                [(question_id, relpath, json.dumps(fields, ensure_ascii=False), run_id, salvaged_at)
+                 for question_id, fields in salvaged],
+            )
+    finally:
+        conn.close()
+
+def lookup_salvage(salvage_path, question_id):
+    """Return [(file, fields)] salvaged for a question id (primary-key lookup)."""
+    if not os.path.exists(salvage_path):
+        return []
+    conn = open_salvage(salvage_path)
+    try:
+        rows = conn.execute("SELECT file, fields FROM salvage WHERE question_id = ? ORDER BY file", (question_id,)).fetchall()
+    finally:
+        conn.close()
+    return [(file, json.loads(fields)) for file, fields in rows]
+
+def process_file(filepath, entry=None, run_id=None, salvage_path=None):
+    """Transform one file in place, skipping journaled and unchanged files.
+
+    Returns (status, item_count, changed_count, journal_record or None).
+    """
+    relpath = os.path.relpath(filepath, APP_ROOT)
+    if not os.path.exists(filepath):
+        print(f"File not found: {filepath}")
+        return 'missing', 0, 0, None
+
+    kind = kind_for(filepath)
+    transform, schema_version = TRANSFORMS[kind]
+    started = time.perf_counter()
+    # Unchanged mtime and size means the journaled hash still holds; skip without reading.
+    if is_journaled(entry, schema_version, stat=os.stat(filepath)):
+        return 'skipped', entry.get('items', 0), 0, None
+
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    if is_journaled(entry, schema_version, digest=digest):
+        stat = os.stat(filepath)
+        return 'skipped', entry.get('items', 0), 0, dict(entry, run_id=run_id, mtime_ns=stat.st_mtime_ns, size=stat.st_size, seconds=0.0, migrated=0)
+
+    try:
+        text = raw.decode('utf-8')
+        data = json.loads(text)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        print(f"Error decoding JSON: {filepath}")
+        return 'error', 0, 0, None
+
+    # One bad file must not abort the pool; it is reported and left unjournaled.
+    try:
+        salvaged = []
+        item_count, migrated_count = transform(data, salvaged)
+        if migrated_count > 0:
+            save_salvage(salvage_path, relpath, salvaged, run_id)
+            indent, trailing_newline = detect_json_layout(text)
+            digest = write_json_atomic(filepath, data, indent, trailing_newline)
+        stat = os.stat(filepath)
+    except (OSError, ValueError, TypeError, AttributeError, sqlite3.Error) as exc:
+        print(f"❌ Error migrating {relpath}: {exc}")
+        return 'error', 0, 0, None
 
     if migrated_count > 0:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"✅ Migrated {migrated_count} items in {filename}")
-    else:
-        print(f"No items needed migration in {filename}")
+        print(f"✅ Migrated {migrated_count} items in {relpath}" if kind == 'lesson' else f"✅ Upgraded {kind} sidecar {relpath}")
+    elif kind == 'lesson':
+        print(f"No items needed migration in {relpath}")
+
+    record = {
+        'type': 'file',
+        'run_id': run_id,
+        'file': relpath,
+        'kind': kind,
+        'sha256': digest,
+        'schema_version': schema_version,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'items': item_count,
+        'migrated': migrated_count,
+        'seconds': round(time.perf_counter() - started, 6),
+    }
+    return 'migrated' if migrated_count else 'unchanged', item_count, migrated_count, record
+
+def resolve_targets(args):
+    if args.files:
+        return [os.path.abspath(path) for path in args.files]
+    kinds = (LOCALES if args.all else ()) + (SIDECAR_KINDS if args.sidecars else ())
+    if kinds:
+        return [path for _theme, _lesson, _kind, path in iter_lesson_files(DATA_DIR, kinds)]
+    return [os.path.join(DATA_DIR, filename) for filename in FILES_TO_MIGRATE]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate legacy stem/what/why/how lesson items and upgrade lesson sidecars to the current schema.")
+    parser.add_argument('files', nargs='*', help=f"Lesson or sidecar JSON files (default: {', '.join(FILES_TO_MIGRATE)} in data/lessons)")
+    parser.add_argument('--all', action='store_true', help="Migrate every locale file under data/lessons/*_units")
+    parser.add_argument('--sidecars', action='store_true', help="Upgrade every *.evidence.json and *.continuity.json under data/lessons/*_units")
+    parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1), help="Files processed concurrently")
+    parser.add_argument('--journal', default=JOURNAL_PATH, help="Path of the NDJSON migration journal")
+    parser.add_argument('--no-journal', action='store_true', help="Neither read nor append to the journal")
+    parser.add_argument('--force', action='store_true', help="Ignore journaled entries and reprocess every file")
+    parser.add_argument('--salvage', default=SALVAGE_PATH, help="SQLite store for dropped legacy fields (real_example, tip, ...)")
+    parser.add_argument('--no-salvage', action='store_true', help="Drop legacy fields without salvaging them")
+    parser.add_argument('--salvage-lookup', metavar='QUESTION_ID', help="Print the salvaged legacy fields for a question id and exit")
+    parser.add_argument('--dry-run', action='store_true', help="Stream each file through migrate_item in memory and print what would change; writes nothing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.salvage_lookup:
+        rows = lookup_salvage(os.path.abspath(args.salvage), args.salvage_lookup)
+        for file, fields in rows:
+            print(json.dumps({'question_id': args.salvage_lookup, 'file': file, 'fields': fields}, ensure_ascii=False))
+        return 0 if rows else 1
+    if args.dry_run:
+        return dry_run(resolve_targets(args), salvage=not args.no_salvage)
+    journal_path = None if args.no_journal else os.path.abspath(args.journal)
+    journal = {} if journal_path is None or args.force else load_journal(journal_path)
+    salvage_path = None if args.no_salvage else os.path.abspath(args.salvage)
+    run_id = uuid.uuid4().hex[:12]
+    started = time.perf_counter()
+    counts = {'migrated': 0, 'unchanged': 0, 'skipped': 0, 'missing': 0, 'error': 0}
+    total_items = 0
+    total_migrated = 0
 
-if __name__ == "__main__":
     print("🚀 Starting Legacy Content Migration...")
-    for filename in FILES_TO_MIGRATE:
-        process_file(filename)
-    print("Done.")
+    targets = resolve_targets(args)
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [
+            pool.submit(process_file, filepath, journal.get(os.path.relpath(filepath, APP_ROOT)), run_id, salvage_path)
+            for filepath in targets
+        ]
+        # Journal from this thread only, as each file finishes, so a crash keeps completed work.
+        for future in as_completed(futures):
+            status, items, migrated, record = future.result()
+            if record is not None:
+                append_journal(journal_path, record)
+            counts[status] += 1
+            total_items += items
+            total_migrated += migrated
+
+    seconds = round(time.perf_counter() - started, 6)
+    append_journal(journal_path, {
+        'type': 'run',
+        'run_id': run_id,
+        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'schema_version': MIGRATION_SCHEMA_VERSION,
+        'seconds': seconds,
+        'files': counts,
+        'items': total_items,
+        'migrated': total_migrated,
+    })
+    print(f"Done. {counts['migrated']} migrated, {counts['unchanged']} unchanged, "
+          f"{counts['skipped']} skipped (journal), {counts['error']} failed, {total_migrated} items in {seconds:.2f}s.")
+    return 1 if counts['error'] else 0
+
+def dry_run(targets, salvage=True):
+    counts = Counter()
+    total_migrated = 0
+    print("🔍 Legacy Content Migration (dry run, nothing is written)...")
+    for filepath in targets:
+        status, _items, migrated = dry_run_file(filepath, salvage)
+        counts[status] += 1
+        total_migrated += migrated
+    print(f"Done. {counts['migrated']} files / {total_migrated} items would migrate, {counts['unchanged']} unchanged.")
+    return 1 if counts['error'] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Tests for the in-memory search in scripts/content_query_server.py.
+
+Usage:
+  python3 -m unittest discover -s scripts -p 'test_*.py'
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import lesson_search_index
+from content_query_server import ContentIndex
+
+LESSONS = {
+    'mental_l01.en.json': [
+        {'id': 'mental_l01_001', 'question': 'Why do we fall asleep late?', 'choices': ['Stress', 'Noise'],
+         'explanation': 'Sleep pressure builds during the day.', 'source_id': 'Walker_2017'},
+        {'id': 'mental_l01_002', 'question': 'What is an implementation intention?', 'choices': ['A plan', 'A goal'],
+         'explanation': 'An if-then plan.', 'source_id': 'Gollwitzer_1999'},
+    ],
+    'mental_l01.ja.json': [
+        {'id': 'mental_l01_001', 'question': '反芻思考とは何ですか？', 'choices': ['考え込むこと', '思い出すこと'],
+         'explanation': '同じ考えを繰り返す。', 'source_id': 'Walker_2017'},
+        {'id': 'mental_l01_002', 'question': '思考の反芻を止めるには？', 'choices': ['ＳＬＥＥＰ', '運動'],
+         'explanation': '計画を立てる。', 'source_id': 'Gollwitzer_1999'},
+    ],
+}
+
+QUERIES = ('sleep', 'Sleep', 'SLEEP', 'ｓｌｅｅｐ', 'asleep', 'plan', 'if then', '反芻', '反芻思考', '芻', '思考 反芻', '?', '')
+
+
+class SearchParityTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        unit_dir = os.path.join(tmp.name, 'lessons', 'mental_units')
+        os.makedirs(unit_dir)
+        for name, items in LESSONS.items():
+            with open(os.path.join(unit_dir, name), 'w', encoding='utf-8') as f:
+                json.dump(items, f, ensure_ascii=False)
+
+        self.server_index = ContentIndex(os.path.join(tmp.name, 'lessons'), os.path.join(tmp.name, 'curated.json'))
+        self.server_index.refresh()
+
+        self.conn = lesson_search_index.connect(os.path.join(tmp.name, 'cache', 'search.sqlite'))
+        self.addCleanup(self.conn.close)
+        with self.conn:
+            for name, items in LESSONS.items():
+                lesson_search_index.index_file(self.conn, name, name.split('.')[1], items)
+
+    def server_hits(self, query, locale=None):
+        return [(hit['id'], hit['locale'], hit['field']) for hit in self.server_index.search(query, locale)]
+
+    def cli_hits(self, query, locale=None):
+        return [row[:3] for row in lesson_search_index.search(self.conn, query, locale)]
+
+    def test_server_matches_cli_search(self):
+        for query in QUERIES:
+            for locale in (None, 'en', 'ja'):
+                with self.subTest(query=query, locale=locale):
+                    self.assertEqual(self.server_hits(query, locale), self.cli_hits(query, locale))
+
+    def test_words_match_whole_tokens_after_nfkc(self):
+        self.assertEqual(self.server_hits('sleep', 'en'), [('mental_l01_001', 'en', 'explanation')])
+        self.assertEqual(self.server_hits('ｓｌｅｅｐ', 'ja'), [('mental_l01_002', 'ja', 'choices')])
+
+    def test_cjk_runs_must_appear_verbatim(self):
+        self.assertEqual(self.server_hits('反芻思考'), [('mental_l01_001', 'ja', 'question')])
+        self.assertEqual(self.server_hits('反芻'), [('mental_l01_001', 'ja', 'question'), ('mental_l01_002', 'ja', 'question')])
+
+    def test_reloaded_file_replaces_its_terms(self):
+        unit_dir = os.path.join(self.server_index.lessons_dir, 'mental_units')
+        path = os.path.join(unit_dir, 'mental_l01.en.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([{'id': 'mental_l01_001', 'question': 'Why do naps help?'}], f)
+        os.utime(path, ns=(1, 1))
+
+        self.assertEqual(self.server_index.refresh(), 1)
+        self.assertEqual(self.server_hits('sleep', 'en'), [])
+        self.assertEqual(self.server_hits('naps'), [('mental_l01_001', 'en', 'question')])
+
+
+if __name__ == '__main__':
+    unittest.main()
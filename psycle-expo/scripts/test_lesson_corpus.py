@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Tests for the shared index helpers in scripts/lesson_corpus.py.
+
+Usage:
+  python3 -m unittest discover -s scripts -p 'test_*.py'
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from lesson_corpus import APP_ROOT, connect_index, sync_index
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (file TEXT NOT NULL, value TEXT);
+"""
+
+
+def load_items(conn, relpath, data):
+    conn.executemany("INSERT INTO items VALUES (?, ?)", [(relpath, value) for value in data])
+
+
+def forget_items(conn, relpath):
+    conn.execute("DELETE FROM items WHERE file = ?", (relpath,))
+
+
+class SyncIndexTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.db_path = os.path.join(self.tmp, 'cache', 'index.sqlite')
+        self.conn = connect_index(self.db_path, SCHEMA, 1)
+        self.addCleanup(lambda: self.conn.close())
+
+    def write(self, name, data, mtime_ns=None):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def sync(self, *paths, rebuild=False):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            counts = sync_index(self.conn, ((path, 'item', load_items) for path in paths), forget_items, rebuild)
+        self.stderr = stderr.getvalue()
+        return counts
+
+    def items(self):
+        return sorted(self.conn.execute("SELECT file, value FROM items"))
+
+    def relpath(self, path):
+        return os.path.relpath(path, APP_ROOT)
+
+    def test_loads_then_skips_unchanged_files(self):
+        a = self.write('a.json', ['x', 'y'])
+        b = self.write('b.json', ['z'])
+
+        self.assertEqual(self.sync(a, b), {'loaded': 2, 'unchanged': 0, 'removed': 0, 'errors': 0})
+        self.assertEqual(self.items(), sorted([(self.relpath(a), 'x'), (self.relpath(a), 'y'), (self.relpath(b), 'z')]))
+        self.assertEqual(self.sync(a, b), {'loaded': 0, 'unchanged': 2, 'removed': 0, 'errors': 0})
+
+    def test_reloads_changed_file_rows(self):
+        a = self.write('a.json', ['x'], mtime_ns=1_000_000_000)
+        self.sync(a)
+
+        self.write('a.json', ['y', 'w'], mtime_ns=2_000_000_000)
+
+        self.assertEqual(self.sync(a)['loaded'], 1)
+        self.assertEqual(self.items(), [(self.relpath(a), 'w'), (self.relpath(a), 'y')])
+
+    def test_touched_file_with_same_content_is_not_reloaded(self):
+        a = self.write('a.json', ['x'], mtime_ns=1_000_000_000)
+        self.sync(a)
+
+        os.utime(a, ns=(2_000_000_000, 2_000_000_000))
+
+        self.assertEqual(self.sync(a), {'loaded': 0, 'unchanged': 1, 'removed': 0, 'errors': 0})
+        stored = self.conn.execute("SELECT mtime_ns FROM files WHERE path = ?", (self.relpath(a),)).fetchone()
+        self.assertEqual(stored, (2_000_000_000,))
+
+    def test_forgets_files_no_longer_in_corpus(self):
+        a = self.write('a.json', ['x'])
+        b = self.write('b.json', ['z'])
+        self.sync(a, b)
+
+        self.assertEqual(self.sync(a)['removed'], 1)
+        self.assertEqual(self.items(), [(self.relpath(a), 'x')])
+        self.assertEqual(self.conn.execute("SELECT path FROM files").fetchall(), [(self.relpath(a),)])
+
+    def test_decode_error_drops_stale_rows_and_is_counted(self):
+        a = self.write('a.json', ['x'], mtime_ns=1_000_000_000)
+        self.sync(a)
+
+        self.write('a.json', '["x",', mtime_ns=2_000_000_000)
+
+        self.assertEqual(self.sync(a), {'loaded': 0, 'unchanged': 0, 'removed': 0, 'errors': 1})
+        self.assertIn(f"Error decoding JSON: {self.relpath(a)}", self.stderr)
+        self.assertEqual(self.items(), [])
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM files").fetchone(), (0,))
+
+    def test_rebuild_reloads_everything(self):
+        a = self.write('a.json', ['x'])
+        self.sync(a)
+
+        self.assertEqual(self.sync(a, rebuild=True)['loaded'], 1)
+        self.assertEqual(self.items(), [(self.relpath(a), 'x')])
+
+    def test_schema_version_change_drops_index(self):
+        a = self.write('a.json', ['x'])
+        self.sync(a)
+        self.conn.close()
+
+        self.conn = connect_index(self.db_path, SCHEMA, 2)
+
+        self.assertEqual(self.items(), [])
+        self.assertEqual(self.sync(a)['loaded'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Tests for scripts/migrate_legacy_content.py.
+
+Usage:
+  python3 -m unittest discover -s scripts -p 'test_*.py'
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import migrate_legacy_content as mlc
+from migrate_legacy_content import iter_json_array
+
+
+def legacy_item(question_id):
+    return {'id': question_id, 'stem': 'Stem?', 'answer_index': 1, 'choices': ['a', 'b'], 'what': 'What.', 'why': 'Why.'}
+
+
+class MigrationTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.journal = os.path.join(self.tmp, 'journal.ndjson')
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+    def read(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def migrate(self, *paths, extra=('--no-salvage',)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            status = mlc.main([*paths, '--journal', self.journal, '--workers', '2', *extra])
+        return status, self.last_run()
+
+    def last_run(self):
+        runs = []
+        with open(self.journal, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record['type'] == 'run':
+                    runs.append(record)
+        return runs[-1]['files']
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    DOCUMENTS = (
+        '[]',
+        '[1.5e3]',
+        '[1.5e+3, -0.25E-2, 12, 0, true, false, null]',
+        '[ "a,]b", "esc\\"aped", "\\u00e9", "日本語" ]',
+        '[{"id": "x", "choices": [1, 2.0, {"k": []}]}, [], {}]',
+        '\n[\n  {"n": 10}\n,\n  {"n": 2.25}\n]\n',
+    )
+
+    def test_every_chunk_size(self):
+        for document in self.DOCUMENTS:
+            expected = json.loads(document)
+            for chunk_size in range(1, len(document) + 2):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    self.assertEqual(list(iter_json_array(io.StringIO(document), chunk_size)), expected)
+
+    def test_invalid_documents(self):
+        for document in ('{"a": 1}', '[1, 2', '[1.]', '[1x]', '["open]'):
+            for chunk_size in (1, 3, 1 << 16):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    with self.assertRaises(ValueError):
+                        list(iter_json_array(io.StringIO(document), chunk_size))
+
+
+
+class JournalTest(MigrationTestCase):
+    def test_second_run_skips_journaled_files(self):
+        paths = [self.write('a.ja.json', [legacy_item('a1')]), self.write('b.ja.json', [legacy_item('b1')])]
+        status, files = self.migrate(*paths)
+        self.assertEqual((status, files['migrated']), (0, 2))
+        self.assertEqual(self.read(paths[0])[0]['question'], 'Stem?')
+        status, files = self.migrate(*paths)
+        self.assertEqual((status, files['skipped'], files['migrated']), (0, 2, 0))
+
+    def test_touched_but_identical_file_is_skipped_by_hash(self):
+        path = self.write('a.ja.json', [legacy_item('a1')])
+        self.migrate(path)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        _status, files = self.migrate(path)
+        self.assertEqual(files['skipped'], 1)
+        self.assertEqual(mlc.load_journal(self.journal)[os.path.relpath(path, mlc.APP_ROOT)]['mtime_ns'],
+                         os.stat(path).st_mtime_ns)
+
+    def test_changed_file_is_processed_again(self):
+        path = self.write('a.ja.json', [legacy_item('a1')])
+        self.migrate(path)
+        self.write('a.ja.json', [legacy_item('a2')])
+        _status, files = self.migrate(path)
+        self.assertEqual(files['migrated'], 1)
+
+    def test_force_ignores_the_journal(self):
+        path = self.write('a.ja.json', [legacy_item('a1')])
+        self.migrate(path)
+        _status, files = self.migrate(path, extra=('--no-salvage', '--force'))
+        self.assertEqual((files['skipped'], files['unchanged']), (0, 1))
+
+    def test_truncated_last_line_is_ignored(self):
+        path = self.write('a.ja.json', [legacy_item('a1')])
+        self.migrate(path)
+        with open(self.journal, 'a', encoding='utf-8') as f:
+            f.write('{"type": "file", "file": "trunc')
+        self.assertIn(os.path.relpath(path, mlc.APP_ROOT), mlc.load_journal(self.journal))
+        _status, files = self.migrate(path)
+        self.assertEqual(files['skipped'], 1)
+        # The new run record must not be glued onto the truncated line.
+        with open(self.journal, 'r', encoding='utf-8') as f:
+            self.assertTrue(f.read().splitlines()[-1].startswith('{"type": "run",'))
+
+    def test_bad_file_does_not_abort_the_run(self):
+        good = self.write('good.ja.json', [legacy_item('g1')])
+        mixed = self.write('mixed.ja.json', [1, 'text', legacy_item('m1')])
+        bad = self.write('bad.ja.json', {'not': 'an array'})
+        status, files = self.migrate(good, mixed, bad)
+        self.assertEqual(status, 1)
+        self.assertEqual((files['migrated'], files['error']), (2, 1))
+        journal = mlc.load_journal(self.journal)
+        self.assertIn(os.path.relpath(good, mlc.APP_ROOT), journal)
+        self.assertIn(os.path.relpath(mixed, mlc.APP_ROOT), journal)
+        self.assertNotIn(os.path.relpath(bad, mlc.APP_ROOT), journal)
+        self.assertEqual(self.read(mixed)[:2], [1, 'text'])
+
+
+
+def citation_count(evidence):
+    """Citations scripts/lib/evidence-parser.js extractCitations reports: legacy field plus array."""
+    entries = [evidence['citation']] if isinstance(evidence.get('citation'), dict) else []
+    entries += [c for c in evidence.get('citations') or [] if isinstance(c, dict)]
+    return sum(1 for c in entries if any(str(c.get(field) or '').strip() for field in mlc.CITATION_ID_FIELDS))
+
+
+class SidecarTransformTest(MigrationTestCase):
+    def test_legacy_citation_is_normalised_in_place_not_duplicated(self):
+        evidence = {'source_type': 'rct', 'citation': {'doi': ' 10.1000/x ', 'pmid': 123}}
+        items, changed = mlc.upgrade_evidence(evidence, [])
+        self.assertEqual((items, changed), (1, 1))
+        self.assertEqual(evidence['citation'], {'doi': '10.1000/x', 'pmid': '123'})
+        self.assertNotIn('citations', evidence)
+        self.assertEqual(citation_count(evidence), 1)
+
+    def test_citation_array_gets_ids_and_default_role(self):
+        evidence = {'citations': [{'pmid': 42}, {'doi': '10.1/y', 'role': 'primary'}, 'stray']}
+        self.assertEqual(mlc.upgrade_evidence(evidence, []), (3, 1))
+        self.assertEqual(evidence['citations'], [{'pmid': '42', 'role': 'supporting'}, {'doi': '10.1/y', 'role': 'primary'}, 'stray'])
+        self.assertEqual(mlc.upgrade_evidence(evidence, []), (3, 0))
+
+    def test_current_continuity_is_left_alone(self):
+        continuity = {'schema_version': mlc.CONTINUITY_SCHEMA_VERSION, 'continuity_mode': 'replace'}
+        self.assertEqual(mlc.upgrade_continuity(dict(continuity), []), (1, 0))
+
+    def test_unversioned_continuity_is_an_error_not_stamped(self):
+        path = self.write('x_l01.continuity.json', {'continuity_mode': 'replace', 'continuity_route': 'review_first'})
+        with open(path, 'rb') as f:
+            before = f.read()
+        status, files = self.migrate(path)
+        self.assertEqual((status, files['error']), (1, 1))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), before)
+
+    def test_sidecar_upgrade_writes_once_then_skips(self):
+        path = self.write('x_l01.evidence.json', {'citation': {'url': ' https://example.org '}})
+        _status, files = self.migrate(path)
+        self.assertEqual(files['migrated'], 1)
+        self.assertEqual(self.read(path), {'citation': {'url': 'https://example.org'}})
+        _status, files = self.migrate(path)
+        self.assertEqual(files['skipped'], 1)
+
+
+
+class SalvageTest(MigrationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.salvage = os.path.join(self.tmp, 'salvage', 'legacy.sqlite')
+        item = dict(legacy_item('q1'), tip='Breathe first.', fun_fact='日本語も残る', emoji_hint='🧠')
+        self.path = self.write('a.ja.json', [item, legacy_item('q2')])
+
+    def test_dropped_fields_round_trip_through_the_store(self):
+        self.migrate(self.path, extra=('--salvage', self.salvage))
+        self.assertNotIn('tip', self.read(self.path)[0])
+        relpath = os.path.relpath(self.path, mlc.APP_ROOT)
+        self.assertEqual(mlc.lookup_salvage(self.salvage, 'q1'),
+                         [(relpath, {'tip': 'Breathe first.', 'fun_fact': '日本語も残る', 'emoji_hint': '🧠'})])
+        self.assertEqual(mlc.lookup_salvage(self.salvage, 'q2'), [])
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertEqual(mlc.main(['--salvage-lookup', 'q1', '--salvage', self.salvage]), 0)
+        self.assertEqual(json.loads(out.getvalue())['fields']['tip'], 'Breathe first.')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(mlc.main(['--salvage-lookup', 'missing', '--salvage', self.salvage]), 1)
+
+    def test_no_salvage_writes_no_store(self):
+        self.migrate(self.path)
+        self.assertFalse(os.path.exists(self.salvage))
+
+    def test_dry_run_reports_salvaged_unless_disabled(self):
+        for extra, label in (((), 'salvaged'), (('--no-salvage',), 'dropped')):
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                mlc.main([self.path, '--dry-run', *extra])
+            lines = [line.split() for line in out.getvalue().splitlines()]
+            self.assertIn(label, [words[0] for words in lines if words])
+            self.assertNotIn({'salvaged': 'dropped', 'dropped': 'salvaged'}[label], [words[0] for words in lines if words])
+        self.assertFalse(os.path.exists(self.salvage))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Tests for scripts/worktree-status-buckets.py.
+
+Usage:
+  python3 -m unittest discover -s scripts -p 'test_*.py'
+"""
+import io
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+
+from lesson_corpus import load_script
+
+wsb = load_script('worktree-status-buckets.py')
+
+
+SHA = '0' * 40
+
+
+def matcher_for(buckets):
+    return wsb.BucketMatcher(wsb.compile_config({'buckets': buckets}))
+
+
+def porcelain(*records):
+    return io.BytesIO(''.join(f"{record}\0" for record in records).encode('utf-8'))
+
+
+class GlobTest(unittest.TestCase):
+    def test_star_stays_within_one_directory(self):
+        regex = wsb.glob_to_regex('*.md')
+        self.assertRegex('README.md', f'^{regex}$')
+        self.assertNotRegex('docs/README.md', f'^{regex}$')
+
+    def test_double_star_spans_directories(self):
+        regex = wsb.glob_to_regex('**/*.snap')
+        for path in ('a.snap', 'e2e/a.snap', 'e2e/deep/a.snap'):
+            self.assertRegex(path, f'^{regex}$')
+
+    def test_character_class_negation(self):
+        regex = wsb.glob_to_regex('lib/[!a]*.ts')
+        self.assertRegex('lib/billing.ts', f'^{regex}$')
+        self.assertNotRegex('lib/analytics.ts', f'^{regex}$')
+
+    def test_parse_rule(self):
+        self.assertEqual(wsb.parse_rule('docs/'), ('prefix', 'docs/', False, None))
+        self.assertEqual(wsb.parse_rule('!docs/_reports/'), ('prefix', 'docs/_reports/', True, None))
+        self.assertEqual(wsb.parse_rule('e2e/**/*.ts'), ('glob', 'e2e/**/*.ts', False, None))
+        self.assertEqual(wsb.parse_rule({'glob': '*.md', 'status': ['D']}), ('glob', '*.md', False, ['D']))
+        self.assertEqual(wsb.parse_rule({'prefix': 'lib/', 'negate': True}), ('prefix', 'lib/', True, None))
+
+    def test_brackets_are_literal_in_plain_rules(self):
+        self.assertEqual(wsb.parse_rule('app/lesson/[id].tsx'), ('prefix', 'app/lesson/[id].tsx', False, None))
+        matcher = matcher_for([
+            {'name': 'route', 'rules': ['app/lesson/[id].tsx', 'app/[slug]/*.tsx']},
+            {'name': 'classes', 'rules': [{'glob': 'app/[ab].tsx'}]},
+        ])
+        self.assertEqual(matcher.bucket_for('app/lesson/[id].tsx', 'M'), 'route')
+        self.assertEqual(matcher.bucket_for('app/lesson/i.tsx', 'M'), 'other')
+        self.assertEqual(matcher.bucket_for('app/[slug]/index.tsx', 'M'), 'route')
+        self.assertEqual(matcher.bucket_for('app/s/index.tsx', 'M'), 'other')
+        self.assertEqual(matcher.bucket_for('app/a.tsx', 'M'), 'classes')
+
+
+class BucketMatcherTest(unittest.TestCase):
+    def test_first_matching_bucket_wins(self):
+        matcher = matcher_for([
+            {'name': 'specific', 'rules': ['lib/supabaseConfig']},
+            {'name': 'broad', 'rules': ['lib/supabase', 'lib/']},
+        ])
+        self.assertEqual(matcher.bucket_for('lib/supabaseConfig.ts', 'M'), 'specific')
+        self.assertEqual(matcher.bucket_for('lib/supabase.ts', 'M'), 'broad')
+        self.assertEqual(matcher.bucket_for('lib/other.ts', 'M'), 'broad')
+        self.assertEqual(matcher.bucket_for('app/index.tsx', 'M'), 'other')
+
+    def test_glob_in_later_bucket_does_not_override_earlier_prefix(self):
+        matcher = matcher_for([
+            {'name': 'docs', 'rules': ['docs/']},
+            {'name': 'markdown', 'rules': ['**/*.md']},
+        ])
+        self.assertEqual(matcher.bucket_for('docs/guide.md', 'M'), 'docs')
+        self.assertEqual(matcher.bucket_for('app/notes.md', 'M'), 'markdown')
+
+    def test_negation_falls_through_to_next_bucket(self):
+        matcher = matcher_for([
+            {'name': 'docs', 'rules': ['docs/', '!docs/_reports/']},
+            {'name': 'reports', 'rules': ['docs/_reports/']},
+        ])
+        self.assertEqual(matcher.bucket_for('docs/guide.md', 'M'), 'docs')
+        self.assertEqual(matcher.bucket_for('docs/_reports/run.json', 'M'), 'reports')
+
+    def test_status_limited_rule(self):
+        matcher = matcher_for([
+            {'name': 'deleted_docs', 'rules': [{'glob': '*.md', 'status': ['D']}]},
+            {'name': 'readme', 'rules': ['README']},
+        ])
+        self.assertEqual(matcher.bucket_for('README.md', 'D'), 'deleted_docs')
+        self.assertEqual(matcher.bucket_for('README.md', 'M'), 'readme')
+        self.assertEqual(matcher.bucket_for('README.md', '??'), 'readme')
+
+    def test_config_matches_first_match_prefix_scan(self):
+        # The trie must classify exactly like the original ordered startswith scan.
+        with open(wsb.CONFIG_PATH, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        prefixes = [
+            (bucket['name'], [rule for rule in bucket['rules'] if isinstance(rule, str) and not rule.startswith('!')])
+            for bucket in config['buckets']
+        ]
+        self.assertFalse([rule for _name, rules in prefixes for rule in rules if wsb.GLOB_CHARS & set(rule)])
+        matcher = wsb.load_matcher(wsb.CONFIG_PATH, cache_path=None)
+        paths = ['data/lessons/mental_units/mental_l01.ja.json', 'misc/untracked.txt', 'README.md']
+        for _name, rules in prefixes:
+            for rule in rules:
+                paths += [rule, rule + 'x.ts', rule + 'sub/x.tsx', rule[:-1]]
+        for path in paths:
+            expected = next((name for name, rules in prefixes if any(path.startswith(rule) for rule in rules)), 'other')
+            self.assertEqual(matcher.bucket_for(path, 'M'), expected, path)
+
+    def test_cached_matcher_classifies_like_a_fresh_one(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'matcher.json')
+            fresh = wsb.load_matcher(wsb.CONFIG_PATH, cache_path)
+            self.assertTrue(os.path.exists(cache_path))
+            cached = wsb.load_matcher(wsb.CONFIG_PATH, cache_path)
+        for path, status in (('docs/guide.md', 'M'), ('README.md', 'D'), ('lib/billing.ts', '??')):
+            self.assertEqual(cached.bucket_for(path, status), fresh.bucket_for(path, status))
+
+
+class PorcelainV2Test(unittest.TestCase):
+    def test_record_kinds(self):
+        stream = porcelain(
+            '# branch.oid ' + SHA,
+            f'1 .M N... 100644 100644 100644 {SHA} {SHA} app/index.tsx',
+            f'1 A. N... 000000 100644 100644 {SHA} {SHA} path with spaces.ts',
+            f'2 R. N... 100644 100644 100644 {SHA} {SHA} R100 lib/new.ts',
+            'lib/old.ts',
+            f'2 C. N... 100644 100644 100644 {SHA} {SHA} C75 lib/copy.ts',
+            'lib/source.ts',
+            f'u UU N... 100644 100644 100644 100644 {SHA} {SHA} {SHA} lib/conflict.ts',
+            '? data/lessons/new.ja.json',
+            '! .cache/index.sqlite',
+        )
+        self.assertEqual(list(wsb.parse_porcelain_v2(stream)), [
+            wsb.StatusEntry('M', 'app/index.tsx'),
+            wsb.StatusEntry('A', 'path with spaces.ts'),
+            wsb.StatusEntry('R', 'lib/new.ts', 'lib/old.ts'),
+            wsb.StatusEntry('C', 'lib/copy.ts', 'lib/source.ts'),
+            wsb.StatusEntry('UU', 'lib/conflict.ts'),
+            wsb.StatusEntry('??', 'data/lessons/new.ja.json'),
+            wsb.StatusEntry('!!', '.cache/index.sqlite'),
+        ])
+
+    def test_fields_split_across_reads(self):
+        stream = porcelain(
+            f'2 RM N... 100644 100644 100644 {SHA} {SHA} R90 lib/新しい.ts',
+            'lib/古い.ts',
+            '? a.txt',
+        )
+        chunk = wsb.READ_CHUNK
+        wsb.READ_CHUNK = 3
+        try:
+            entries = list(wsb.parse_porcelain_v2(stream))
+        finally:
+            wsb.READ_CHUNK = chunk
+        self.assertEqual(entries, [wsb.StatusEntry('RM', 'lib/新しい.ts', 'lib/古い.ts'), wsb.StatusEntry('??', 'a.txt')])
+
+
+class LogNameStatusTest(unittest.TestCase):
+    def test_commits_with_renames_copies_and_empty_commits(self):
+        # Byte layout of `git log -z --name-status -M --format=%x01%H%x09%s`.
+        stream = io.BytesIO(
+            b'\x01' + b'a' * 40 + b'\tempty\0'
+            b'\x01' + b'b' * 40 + b'\ttwo words\0\nR100\0lib/old.ts\0lib/new.ts\0C080\0x.ts\0y.ts\0M\0app/a.tsx\0'
+            b'\x01' + b'c' * 40 + b'\tfirst\0\nA\0docs/readme.md\0D\0gone.md\0'
+        )
+        self.assertEqual(list(wsb.parse_log_name_status(stream)), [
+            ('a' * 40, 'empty', []),
+            ('b' * 40, 'two words', [
+                wsb.StatusEntry('R', 'lib/new.ts', 'lib/old.ts'),
+                wsb.StatusEntry('C', 'y.ts', 'x.ts'),
+                wsb.StatusEntry('M', 'app/a.tsx'),
+            ]),
+            ('c' * 40, 'first', [wsb.StatusEntry('A', 'docs/readme.md'), wsb.StatusEntry('D', 'gone.md')]),
+        ])
+
+    def test_empty_stream(self):
+        self.assertEqual(list(wsb.parse_log_name_status(io.BytesIO(b''))), [])
+
+
+class SnapshotTreeTest(unittest.TestCase):
+    def test_prunes_gitignored_directories(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            subprocess.run(['git', 'init', '-q', tmp], check=True)
+            files = {
+                '.gitignore': 'ios/Pods/\n.expo/\n*.log\n',
+                'ios/Podfile': '',
+                'ios/Pods/Lib/lib.m': '',
+                '.expo/state.json': '',
+                'app/index.tsx': '',
+                'app/debug.log': '',
+                'node_modules/pkg/index.js': '',
+            }
+            for name, content in files.items():
+                path = os.path.join(tmp, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+
+            ignored = wsb.ignored_dirs(tmp)
+            snapshot = wsb.snapshot_tree(tmp, prune=ignored)
+
+        self.assertTrue({'ios/Pods', '.expo'} <= ignored)
+        self.assertEqual(sorted(snapshot), ['.gitignore', 'app/debug.log', 'app/index.tsx', 'ios/Podfile'])
+
+
+if __name__ == '__main__':
+    unittest.main()
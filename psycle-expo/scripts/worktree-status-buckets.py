@@ -1,216 +1,1056 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import queue
+import re
+import shlex
+import sqlite3
 import subprocess
+import sys
+import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AbstractSet, BinaryIO, TextIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
-BUCKETS = OrderedDict(
-    [
-        (
-            "hygiene_tooling",
-            [
-                ".gitignore",
-                "docs/",
-                "scripts/ios/",
-                "scripts/native-agent/",
-                "scripts/review-factcheck.sh",
-                "scripts/worktree-status-buckets.py",
-            ],
-        ),
-        (
-            "release_config",
-            [
-                "app.config.js",
-                "eas.json",
-                "config/",
-                "package.json",
-                "package-lock.json",
-                "scripts/check-launch-",
-                "scripts/run-release-smoke-e2e.sh",
-                "scripts/metro/",
-                "e2e/",
-                "lib/supabase",
-                "lib/supabaseConfig",
-                "lib/navigation/",
-            ],
-        ),
-        (
-            "screen_shells",
-            [
-                "app/_layout.tsx",
-                "app/(tabs)/",
-                "app/auth.tsx",
-                "app/lesson.tsx",
-                "app/mistakes-hub.tsx",
-                "app/review.tsx",
-                "app/onboarding/",
-                "app/settings/",
-                "components/course/",
-                "components/friends/",
-                "components/leaderboard/",
-                "components/lesson/",
-                "components/profile/",
-                "components/quests/",
-                "components/review/",
-                "components/settings/",
-                "components/shop/",
-            ],
-        ),
-        (
-            "ui_foundation",
-            [
-                "components/AppErrorBoundary",
-                "components/CourseWorldHero",
-                "components/CustomIcons",
-                "components/GlobalHeader",
-                "components/LeagueResultModal",
-                "components/StreakCalendar",
-                "components/course-world/",
-                "components/ui",
-                "lib/theme",
-            ],
-        ),
-        (
-            "question_runtime",
-            [
-                "components/QuestionRenderer",
-                "components/QuestionTypes",
-                "components/question-runtime/",
-                "components/question-types/",
-                "types/question.ts",
-            ],
-        ),
-        (
-            "app_state",
-            [
-                "lib/app-state/",
-                "lib/badges.ts",
-                "lib/streaks.ts",
-            ],
-        ),
-        (
-            "analytics_content_config",
-            [
-                "components/AnalyticsDebug",
-                "components/analyticsDebugSections",
-                "lib/analytics",
-                "lib/remoteContent",
-                "lib/lessons.ts",
-                "lib/lesson-data/",
-                "lib/gamificationConfig",
-                "lib/courseWorld",
-                "data/themes/",
-                "lib/themeManifestRuntime",
-                "scripts/check-theme-readiness.js",
-            ],
-        ),
-        (
-            "lesson_runtime",
-            [
-                "lib/lesson/",
-                "lib/lessonContinuity",
-                "lib/lessonOperational",
-                "lib/mastery",
-                "lib/onboardingSelection",
-                "types/lesson",
-                "config/gamification.json",
-            ],
-        ),
-        (
-            "billing_shop",
-            [
-                "lib/billing",
-                "lib/checkoutPolicy",
-                "lib/shop/",
-            ],
-        ),
-        (
-            "content_generation_pipeline",
-            [
-                "scripts/README_AUTO_GENERATE.md",
-                "scripts/auto_generate_problems.mjs",
-                "scripts/audit-lesson-perspectives.mjs",
-                "scripts/check-content-package.js",
-                "scripts/content-generator/",
-                "scripts/content-preflight.js",
-                "scripts/expand_",
-                "scripts/generate-evidence-scaffold.js",
-                "scripts/lib/",
-                "scripts/promote-staged-lesson.sh",
-                "scripts/sync-",
-                "scripts/validate-lessons.ts",
-            ],
-        ),
-        (
-            "social_league_quest",
-            [
-                "lib/friend",
-                "lib/social.ts",
-                "lib/league",
-                "lib/quest",
-                "lib/notifications",
-            ],
-        ),
-        (
-            "generated_data",
-            [
-                "data/lessons/",
-                "lib/locales/",
-                "scripts/gen-lesson-locale-index.js",
-            ],
-        ),
-        (
-            "preview_debug",
-            [
-                "design-previews/",
-                "app/debug/",
-                "components/provisional/",
-                "lib/debug/",
-                "lib/settings/settingsDebugRoutes",
-                "public/",
-            ],
-        ),
-        (
-            "test_contracts",
-            [
-                "src/__tests__/",
-            ],
-        ),
-    ]
-)
-
-
-def bucket_for(path: str, status: str) -> str:
-    if status == "D" and "/" not in path and path.endswith(".md"):
-        return "hygiene_tooling"
-    for name, prefixes in BUCKETS.items():
-        if any(path.startswith(prefix) for prefix in prefixes):
-            return name
-    return "other"
-
-
-def main() -> int:
-    proc = subprocess.run(
-        ["git", "status", "--short"],
-        cwd="/Users/mashitashinji/dev/psych-duo-packs/psycle-expo",
+from lesson_corpus import APP_ROOT, CACHE_DIR, load_json_cache, save_json_cache
+
+STATS_CACHE_PATH = os.path.join(CACHE_DIR, "worktree_status_line_counts.json")
+STATS_CACHE_VERSION = 1
+SNAPSHOT_LOG_PATH = os.path.join(CACHE_DIR, "worktree_status_snapshots.ndjson")
+COMMIT_CACHE_PATH = os.path.join(CACHE_DIR, "worktree_commit_changes.sqlite")
+# Marks the start of each commit header in the `git log -z` stream.
+COMMIT_MARK = "\x01"
+READ_CHUNK = 64 * 1024
+# `git diff` against this tree shows everything in a repository without commits.
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+# Directories never walked by --watch; git metadata is tracked via the index file instead.
+WATCH_PRUNE_DIRS = {".git", "node_modules", ".cache"}
+# Above this many changed paths a full status is cheaper than a long pathspec list.
+WATCH_PATHSPEC_LIMIT = 500
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worktree-buckets.json")
+MATCHER_CACHE_PATH = os.path.join(CACHE_DIR, "worktree_buckets_matcher.json")
+# Bump when the compiled matcher layout changes.
+MATCHER_VERSION = 3
+# Wildcards that make a plain string rule a glob. `[` stays literal there, since
+# Expo Router paths such as app/lesson/[id].tsx are common; use {"glob": ...} for classes.
+GLOB_CHARS = set("*?")
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a path glob: `*`/`?` stay within one directory, `**` spans directories."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            close = pattern.find("]", i + 2)
+            if close < 0:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:close]
+                if len(body) == 1:
+                    out.append(re.escape(body))
+                else:
+                    out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+                i = close
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "".join(out)
+
+
+def parse_rule(rule) -> Tuple[str, str, bool, Optional[List[str]]]:
+    """Normalise a config rule to (kind, pattern, negate, statuses)."""
+    if isinstance(rule, str):
+        negate = rule.startswith("!")
+        pattern = rule[1:] if negate else rule
+        if not GLOB_CHARS & set(pattern):
+            return "prefix", pattern, negate, None
+        # "[[]" is the glob spelling of a literal "[".
+        return "glob", pattern.replace("[", "[[]"), negate, None
+    kind = "glob" if "glob" in rule else "prefix"
+    return kind, rule[kind], bool(rule.get("negate")), rule.get("status")
+
+
+def compile_config(config: dict) -> dict:
+    """Compile bucket rules into a JSON-serialisable matcher.
+
+    Unconditional prefix rules go into one character trie whose terminal ""
+    keys hold a bitmask of the buckets listing that prefix. Globs and
+    status-limited rules become one regex per bucket (grouped by status
+    set), and negations one exclusion regex per bucket.
+    """
+    names, trie, buckets = [], {}, []
+    for index, bucket in enumerate(config["buckets"]):
+        names.append(bucket["name"])
+        positive, negative, by_status = [], [], {}
+        for rule in bucket["rules"]:
+            kind, pattern, negate, statuses = parse_rule(rule)
+            regex = glob_to_regex(pattern) if kind == "glob" else re.escape(pattern) + ".*"
+            if negate:
+                negative.append(regex)
+            elif statuses:
+                by_status.setdefault(",".join(sorted(statuses)), []).append(regex)
+            elif kind == "glob":
+                positive.append(regex)
+            else:
+                node = trie
+                for char in pattern:
+                    node = node.setdefault(char, {})
+                node[""] = node.get("", 0) | (1 << index)
+        buckets.append(
+            {
+                "glob": "|".join(positive) or None,
+                "negate": "|".join(negative) or None,
+                "status": [[key.split(","), "|".join(regexes)] for key, regexes in by_status.items()],
+            }
+        )
+    return {
+        "names": names,
+        "trie": trie,
+        "buckets": buckets,
+        "repos": config.get("repos", {}),
+        "checks": config.get("checks", {}),
+    }
+
+
+class BucketMatcher:
+    """First-match bucket classifier built from a compiled config."""
+
+    def __init__(self, compiled: dict) -> None:
+        self.names = compiled["names"]
+        self.trie = compiled["trie"]
+        self.repos = compiled["repos"]
+        self.checks = compiled["checks"]
+        self.rules = []
+        # Buckets that need regex checks even when the trie found no prefix.
+        self.conditional = 0
+        for index, bucket in enumerate(compiled["buckets"]):
+            glob = re.compile(bucket["glob"]) if bucket["glob"] else None
+            negate = re.compile(bucket["negate"]) if bucket["negate"] else None
+            status = [(set(statuses), re.compile(regex)) for statuses, regex in bucket["status"]]
+            self.rules.append((glob, negate, status))
+            if glob or status:
+                self.conditional |= 1 << index
+
+    def bucket_for(self, path: str, status: str) -> str:
+        node = self.trie
+        mask = 0
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            mask |= node.get("", 0)
+        candidates = mask | self.conditional
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            index = low.bit_length() - 1
+            glob, negate, status_rules = self.rules[index]
+            matched = bool(mask & low) or bool(glob and glob.fullmatch(path)) or any(
+                status in statuses and regex.fullmatch(path) for statuses, regex in status_rules
+            )
+            if matched and not (negate and negate.fullmatch(path)):
+                return self.names[index]
+        return "other"
+
+
+def load_matcher(config_path: str = CONFIG_PATH, cache_path: Optional[str] = MATCHER_CACHE_PATH) -> BucketMatcher:
+    """Load the bucket config, reusing the compiled matcher cached under its sha256."""
+    with open(config_path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    cached = load_json_cache(cache_path, MATCHER_VERSION)
+    if cached and cached.get("sha256") == digest and "matcher" in cached:
+        return BucketMatcher(cached["matcher"])
+    compiled = compile_config(json.loads(raw.decode("utf-8")))
+    save_json_cache(cache_path, MATCHER_VERSION, {"sha256": digest, "matcher": compiled})
+    return BucketMatcher(compiled)
+
+
+class StatusEntry(NamedTuple):
+    status: str
+    path: str
+    orig_path: Optional[str] = None
+    repo: str = ""
+
+
+class Repo(NamedTuple):
+    label: str
+    cwd: str
+
+
+def iter_nul_fields(stream: BinaryIO) -> Iterator[str]:
+    """Yield NUL-terminated fields as soon as each one is complete."""
+    pending = b""
+    while True:
+        chunk = stream.read1(READ_CHUNK) if hasattr(stream, "read1") else stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        pending += chunk
+        *fields, pending = pending.split(b"\0")
+        for field in fields:
+            yield field.decode("utf-8", "surrogateescape")
+    if pending:
+        yield pending.decode("utf-8", "surrogateescape")
+
+
+def short_status(xy: str) -> str:
+    """Porcelain v2 XY ('.' for unchanged) in the `git status --short` spelling."""
+    return xy.replace(".", " ").strip()
+
+
+def parse_porcelain_v2(stream: BinaryIO) -> Iterator[StatusEntry]:
+    """Parse `git status --porcelain=v2 -z` records from a byte stream.
+
+    Ordinary (1), rename/copy (2, followed by a separate original-path field),
+    unmerged (u), untracked (?) and ignored (!) records are supported; headers
+    (#) are skipped.
+    """
+    fields = iter_nul_fields(stream)
+    for field in fields:
+        if not field:
+            continue
+        kind = field[0]
+        if kind == "1":
+            parts = field.split(" ", 8)
+            yield StatusEntry(short_status(parts[1]), parts[8])
+        elif kind == "2":
+            parts = field.split(" ", 9)
+            yield StatusEntry(short_status(parts[1]), parts[9], next(fields, None))
+        elif kind == "u":
+            parts = field.split(" ", 10)
+            yield StatusEntry(short_status(parts[1]), parts[10])
+        elif kind == "?":
+            yield StatusEntry("??", field[2:])
+        elif kind == "!":
+            yield StatusEntry("!!", field[2:])
+
+
+def repo_prefix(cwd: str) -> str:
+    """Path of cwd inside its repository ('' at the top level, else ending in '/')."""
+    return git_output(["rev-parse", "--show-prefix"], cwd)
+
+
+def relative_to(path: str, prefix: str) -> str:
+    # Porcelain paths are always repository-root relative; bucket rules are app-root relative.
+    if not prefix:
+        return path
+    if path.startswith(prefix):
+        return path[len(prefix):]
+    return posixpath.relpath(path, prefix.rstrip("/"))
+
+
+def iter_status(
+    cwd: str = APP_ROOT,
+    pathspecs: Optional[Iterable[str]] = None,
+    untracked: str = "normal",
+) -> Iterator[StatusEntry]:
+    """Stream status entries from git as they are produced, relative to cwd.
+
+    pathspecs (relative to cwd, matched literally) limit the status to those paths.
+    """
+    prefix = repo_prefix(cwd)
+    cmd = ["git", "--literal-pathspecs", "status", "--porcelain=v2", "-z", f"--untracked-files={untracked}"]
+    if pathspecs is not None:
+        cmd += ["--", *pathspecs]
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for entry in parse_porcelain_v2(proc.stdout):
+            yield entry._replace(
+                path=relative_to(entry.path, prefix),
+                orig_path=relative_to(entry.orig_path, prefix) if entry.orig_path else None,
+            )
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+
+
+def git_output(args: List[str], cwd: str, check: bool = True) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=cwd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
-        check=True,
+        check=check,
+    ).stdout.strip()
+
+
+def submodule_roots(root: str) -> List[str]:
+    """Checked-out submodules of the repository at root, recursively."""
+    if not os.path.exists(os.path.join(root, ".gitmodules")):
+        return []
+    output = git_output(
+        ["config", "--file", ".gitmodules", "--get-regexp", r"^submodule\..*\.path$"], root, check=False
     )
-    grouped = OrderedDict((name, []) for name in list(BUCKETS.keys()) + ["other"])
-    for raw_line in proc.stdout.splitlines():
-        if not raw_line.strip():
+    roots = []
+    for line in output.splitlines():
+        _key, _sep, path = line.partition(" ")
+        sub_root = os.path.join(root, path)
+        # Uninitialised submodules are an empty directory without a .git file.
+        if path and os.path.exists(os.path.join(sub_root, ".git")):
+            roots.append(sub_root)
+            roots.extend(submodule_roots(sub_root))
+    return roots
+
+
+def discover_repos(cwd: str = APP_ROOT) -> List[Repo]:
+    """The app's repository, its outermost superproject and every checked-out submodule.
+
+    The app's repository is queried from cwd so its paths stay app-root
+    relative; the others report paths relative to their own root.
+    """
+    app_top = git_output(["rev-parse", "--show-toplevel"], cwd)
+    top = app_top
+    while True:
+        superproject = git_output(["rev-parse", "--show-superproject-working-tree"], top)
+        if not superproject:
+            break
+        top = superproject
+    repos = [Repo(os.path.basename(app_top), cwd)]
+    for root in [top] + submodule_roots(top):
+        if os.path.realpath(root) != os.path.realpath(app_top):
+            repos.append(Repo(os.path.basename(root), root))
+    return repos
+
+
+def collect_status(repos: List[Repo]) -> Iterator[StatusEntry]:
+    """Run every repo's status concurrently and yield entries as they arrive.
+
+    Each entry is tagged with its repo label. A superproject's gitlink entries
+    for submodules are dropped, since each submodule reports its own files.
+    """
+    repo_roots = {os.path.realpath(git_output(["rev-parse", "--show-toplevel"], repo.cwd)) for repo in repos}
+    results: "queue.Queue" = queue.Queue()
+    done = object()
+
+    def run(repo: Repo) -> None:
+        try:
+            for entry in iter_status(repo.cwd):
+                results.put((repo, entry._replace(repo=repo.label)))
+        except BaseException as exc:  # re-raised on the consuming thread
+            results.put((repo, exc))
+        finally:
+            results.put((repo, done))
+
+    with ThreadPoolExecutor(max_workers=len(repos)) as pool:
+        for repo in repos:
+            pool.submit(run, repo)
+        remaining = len(repos)
+        while remaining:
+            repo, item = results.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            elif os.path.realpath(os.path.join(repo.cwd, item.path)) not in repo_roots:
+                yield item
+
+
+def classify(entry: StatusEntry, matcher: BucketMatcher) -> str:
+    # Submodules whose paths do not follow the app layout are bucketed as a whole.
+    return matcher.repos.get(entry.repo) or matcher.bucket_for(entry.path, entry.status)
+
+
+class BucketStats(NamedTuple):
+    files: int = 0
+    added: int = 0
+    removed: int = 0
+    size: int = 0
+
+    def add(self, added: Optional[int], removed: Optional[int], size: int) -> "BucketStats":
+        return BucketStats(self.files + 1, self.added + (added or 0), self.removed + (removed or 0), self.size + size)
+
+
+def diff_numstat(repo: Repo) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    """Added/removed line counts of every tracked change (staged or not) against HEAD.
+
+    One `git diff --numstat -z` call per repo; binary files map to (None, None).
+    Paths are keyed the same way as that repo's status entries.
+    """
+    base = "HEAD" if git_output(["rev-parse", "--verify", "-q", "HEAD"], repo.cwd, check=False) else EMPTY_TREE
+    raw = subprocess.run(
+        ["git", "diff", base, "--numstat", "-z", "-M"],
+        cwd=repo.cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    ).stdout
+    prefix = repo_prefix(repo.cwd)
+    fields = iter(raw.decode("utf-8", "surrogateescape").split("\0"))
+    counts = {}
+    for field in fields:
+        if not field:
             continue
-        status = raw_line[:3].strip()
-        path = raw_line[3:].strip()
-        grouped[bucket_for(path, status)].append((status, path))
+        added, removed, path = field.split("\t", 2)
+        if not path:
+            # Renames put the original and new paths in their own fields.
+            next(fields, None)
+            path = next(fields, "")
+        counts[relative_to(path, prefix)] = (
+            int(added) if added != "-" else None,
+            int(removed) if removed != "-" else None,
+        )
+    return counts
+
+
+def untracked_lines(path: str, cache: dict, fresh: dict) -> Tuple[Optional[int], int]:
+    """(line count or None for binary, byte size) of an untracked file or directory."""
+    if os.path.isdir(path):
+        lines, size = 0, 0
+        for dirpath, _dirnames, filenames in os.walk(path):
+            for name in filenames:
+                file_lines, file_size = untracked_lines(os.path.join(dirpath, name), cache, fresh)
+                lines += file_lines or 0
+                size += file_size
+        return lines, size
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 0, 0
+    cached = cache.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        lines = cached[2]
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+        lines = None if b"\0" in data[:8192] else data.count(b"\n") + (0 if data.endswith(b"\n") or not data else 1)
+    fresh[path] = [stat.st_mtime_ns, stat.st_size, lines]
+    return lines, stat.st_size
+
+
+def bucket_stats(
+    grouped: "OrderedDict[str, List[StatusEntry]]",
+    repos: List[Repo],
+    cache_path: Optional[str] = STATS_CACHE_PATH,
+) -> Dict[str, BucketStats]:
+    """Per-bucket file, line and byte totals for the grouped status entries."""
+    with ThreadPoolExecutor(max_workers=len(repos)) as pool:
+        numstats = dict(zip((repo.label for repo in repos), pool.map(diff_numstat, repos)))
+    cwd_for = {repo.label: repo.cwd for repo in repos}
+    cache = (load_json_cache(cache_path, STATS_CACHE_VERSION) or {}).get("entries", {})
+    fresh: dict = {}
+    totals = {}
+    for bucket, items in grouped.items():
+        stats = BucketStats()
+        for entry in items:
+            path = os.path.join(cwd_for.get(entry.repo, APP_ROOT), entry.path)
+            if entry.status == "??":
+                lines, size = untracked_lines(path, cache, fresh)
+                stats = stats.add(lines, 0, size)
+                continue
+            added, removed = numstats.get(entry.repo, {}).get(entry.path, (0, 0))
+            size = os.path.getsize(path) if os.path.isfile(path) else 0
+            stats = stats.add(added, removed, size)
+        totals[bucket] = stats
+    save_json_cache(cache_path, STATS_CACHE_VERSION, {"entries": fresh})
+    return totals
+
+
+def format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KiB"
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+
+def format_stats(stats: BucketStats) -> str:
+    return f"{stats.files} files, +{stats.added} -{stats.removed} lines, {format_size(stats.size)}"
+
+
+def format_entry(entry: StatusEntry, app_repo: str = "") -> str:
+    path = f"{entry.orig_path} -> {entry.path}" if entry.orig_path else entry.path
+    if entry.repo and entry.repo != app_repo:
+        path = f"{entry.repo}:{path}"
+    return f"{entry.status:2} {path}"
+
+
+def print_buckets(
+    grouped: "OrderedDict[str, List[StatusEntry]]",
+    only: Optional[Set[str]] = None,
+    app_repo: str = "",
+    stats: Optional[Dict[str, BucketStats]] = None,
+) -> None:
+    for bucket, items in grouped.items():
+        if only is None and not items:
+            continue
+        if only is not None and bucket not in only:
+            continue
+        if stats is not None:
+            print(f"[{bucket}] {format_stats(stats[bucket])}")
+        else:
+            print(f"[{bucket}] {len(items)}")
+        for entry in items:
+            print(f"  {format_entry(entry, app_repo)}")
+        print()
+
+
+def empty_groups(matcher: BucketMatcher) -> "OrderedDict[str, List[StatusEntry]]":
+    return OrderedDict((name, []) for name in matcher.names + ["other"])
+
+
+def group_entries(entries: Iterable[StatusEntry], matcher: BucketMatcher) -> "OrderedDict[str, List[StatusEntry]]":
+    grouped = empty_groups(matcher)
+    for entry in sorted(entries, key=lambda entry: (entry.path, entry.status)):
+        grouped[classify(entry, matcher)].append(entry)
+    return grouped
+
 
+def git_dir(cwd: str = APP_ROOT) -> str:
+    return git_output(["rev-parse", "--absolute-git-dir"], cwd)
+
+
+def ignored_dirs(root: str = APP_ROOT) -> Set[str]:
+    """Gitignored directories under root (e.g. ios/Pods, .expo), relative and "/"-separated."""
+    out = subprocess.run(
+        ["git", "ls-files", "-z", "--others", "--ignored", "--exclude-standard", "--directory"],
+        cwd=root,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    ).stdout
+    return {os.fsdecode(path).rstrip("/") for path in out.split(b"\0") if path.endswith(b"/")}
+
+
+def snapshot_tree(root: str = APP_ROOT, prune: AbstractSet[str] = frozenset()) -> Dict[str, Tuple[int, int]]:
+    """Map every file under root to (mtime_ns, size).
+
+    Skips WATCH_PRUNE_DIRS anywhere and the root-relative directories in prune,
+    so ignored build trees are never stat'ed.
+    """
+    snapshot = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        prefix = "" if rel_dir == "." else f"{rel_dir}/"
+        dirnames[:] = [
+            name for name in dirnames if name not in WATCH_PRUNE_DIRS and f"{prefix}{name}" not in prune
+        ]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.lstat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[f"{prefix}{name}"] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def changed_paths(before: Dict[str, Tuple[int, int]], after: Dict[str, Tuple[int, int]]) -> Set[str]:
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+
+def index_state(index_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(index_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def watch(interval: float, matcher: BucketMatcher) -> int:
+    """Poll the tree and reprint only the buckets whose entries changed.
+
+    File edits re-run status for just the changed paths; a change to the git
+    index (staging, commits, checkouts) re-runs the full status. Untracked
+    files are listed individually so each one can be updated on its own.
+    """
+    index_path = os.path.join(git_dir(), "index")
+    # A set, not a dict by path: one path can have several entries (e.g. `D ` staged plus `??`).
+    state = set(iter_status(untracked="all"))
+    # Resolved once: directories ignored at startup stay unwatched for the session.
+    ignored = ignored_dirs()
+    snapshot = snapshot_tree(prune=ignored)
+    index = index_state(index_path)
+    print_buckets(group_entries(state, matcher))
+    try:
+        while True:
+            time.sleep(interval)
+            new_snapshot = snapshot_tree(prune=ignored)
+            new_index = index_state(index_path)
+            changed = changed_paths(snapshot, new_snapshot)
+            if not changed and new_index == index:
+                continue
+            if new_index != index or len(changed) > WATCH_PATHSPEC_LIMIT:
+                new_state = set(iter_status(untracked="all"))
+            else:
+                new_state = {
+                    entry for entry in state if entry.path not in changed and entry.orig_path not in changed
+                }
+                new_state.update(iter_status(pathspecs=sorted(changed), untracked="all"))
+            snapshot, index = new_snapshot, new_index
+            affected = {classify(entry, matcher) for entry in state ^ new_state}
+            state = new_state
+            if affected:
+                print(f"--- {time.strftime('%H:%M:%S')} ---")
+                print_buckets(group_entries(state, matcher), only=affected)
+    except KeyboardInterrupt:
+        return 0
+
+
+def checks_for(
+    grouped: "OrderedDict[str, List[StatusEntry]]",
+    matcher: BucketMatcher,
+    app_repo: str = "",
+) -> List[str]:
+    """Commands covering every dirty bucket, de-duplicated in bucket order.
+
+    `{paths}` in a command expands to the bucket's app-repo paths that still
+    exist; a command whose `{paths}` would be empty is skipped.
+    """
+    commands = []
     for bucket, items in grouped.items():
         if not items:
             continue
-        print(f"[{bucket}] {len(items)}")
-        for status, path in items:
-            print(f"  {status:2} {path}")
+        paths = [
+            entry.path
+            for entry in items
+            if entry.repo in ("", app_repo) and os.path.exists(os.path.join(APP_ROOT, entry.path))
+        ]
+        for command in matcher.checks.get(bucket, []):
+            if "{paths}" in command:
+                if not paths:
+                    continue
+                command = command.replace("{paths}", " ".join(shlex.quote(path) for path in paths))
+            if command not in commands:
+                commands.append(command)
+    return commands
+
+
+def run_check(command: str) -> Tuple[str, int, float, str]:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        command,
+        shell=True,
+        cwd=APP_ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    return command, proc.returncode, time.perf_counter() - started, proc.stdout
+
+
+def run_checks(commands: List[str], jobs: int, out: TextIO = sys.stdout) -> int:
+    """Run checks in parallel, reporting each as it finishes. Returns 1 if any failed."""
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(run_check, command) for command in commands]
+        for future in as_completed(futures):
+            command, returncode, elapsed, output = future.result()
+            mark = "✅" if returncode == 0 else "❌"
+            print(f"{mark} {command} ({elapsed:.1f}s)", file=out, flush=True)
+            if returncode != 0:
+                failed.append((command, output))
+    for command, output in failed:
+        print(f"\n--- {command} ---", file=out)
+        print(output.rstrip(), file=out)
+    return 1 if failed else 0
+
+
+def entry_record(entry: StatusEntry, bucket: str) -> dict:
+    return {
+        "bucket": bucket,
+        "status": entry.status,
+        "path": entry.path,
+        "orig_path": entry.orig_path,
+        "repo": entry.repo,
+    }
+
+
+def record_key(record: dict) -> Tuple[str, str, str, Optional[str]]:
+    return record["repo"], record["path"], record["status"], record["orig_path"]
+
+
+def read_last_snapshot(log_path: str) -> Optional[dict]:
+    """Last record of the snapshot log, read backwards from the end of the file."""
+    try:
+        with open(log_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            tail = b""
+            while position > 0:
+                step = min(READ_CHUNK, position)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+                if tail.rstrip(b"\n").count(b"\n") >= 1:
+                    break
+    except FileNotFoundError:
+        return None
+    lines = tail.rstrip(b"\n").split(b"\n")
+    try:
+        return json.loads(lines[-1].decode("utf-8")) if lines[-1] else None
+    except ValueError:
+        return None
+
+
+def append_snapshot(log_path: str, records: List[dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+    snapshot = {"taken_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "entries": records}
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def snapshot_changes(previous: Optional[dict], records: List[dict]) -> dict:
+    """Set difference between the previous snapshot's entries and the current ones."""
+    before = {record_key(record): record for record in (previous or {}).get("entries", [])}
+    after = {record_key(record): record for record in records}
+    return {
+        "since": previous.get("taken_at") if previous else None,
+        "added": [after[key] for key in sorted(after.keys() - before.keys(), key=str)],
+        "removed": [before[key] for key in sorted(before.keys() - after.keys(), key=str)],
+    }
+
+
+def print_changes(changes: dict, app_repo: str = "") -> None:
+    since = changes["since"] or "no previous snapshot"
+    print(f"[since {since}] +{len(changes['added'])} -{len(changes['removed'])}")
+    for mark, key in (("+", "added"), ("-", "removed")):
+        for record in changes[key]:
+            entry = StatusEntry(record["status"], record["path"], record["orig_path"], record["repo"])
+            print(f"  {mark} {format_entry(entry, app_repo)}  [{record['bucket']}]")
+    print()
+
+
+def open_commit_cache(cache_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    conn = sqlite3.connect(cache_path)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS commits (sha TEXT PRIMARY KEY, subject TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS changes (
+            sha TEXT NOT NULL, status TEXT NOT NULL, path TEXT NOT NULL, orig_path TEXT
+        );
+        CREATE INDEX IF NOT EXISTS changes_sha ON changes (sha);
+        """
+    )
+    return conn
+
+
+def parse_log_name_status(stream: BinaryIO) -> Iterator[Tuple[str, str, List[StatusEntry]]]:
+    """Parse `git log -z --name-status --format=%x01%H%x09%s` into (sha, subject, entries).
+
+    Paths stay repository-root relative; rename/copy scores are dropped from the status.
+    """
+    fields = iter_nul_fields(stream)
+    commit = None
+    for field in fields:
+        field = field.lstrip("\n")
+        if not field:
+            continue
+        if field.startswith(COMMIT_MARK):
+            if commit is not None:
+                yield commit
+            sha, _tab, subject = field[1:].partition("\t")
+            commit = (sha, subject, [])
+            continue
+        if commit is None:
+            continue
+        status = field[0]
+        if status in "RC":
+            orig_path = next(fields, "")
+            commit[2].append(StatusEntry(status, next(fields, ""), orig_path))
+        else:
+            commit[2].append(StatusEntry(status, next(fields, "")))
+    if commit is not None:
+        yield commit
+
+
+def cache_commits(conn: sqlite3.Connection, shas: List[str], cwd: str = APP_ROOT) -> int:
+    """Read name-status for uncached commits from one `git log --stdin` stream. Returns commits added."""
+    cached = {row[0] for row in conn.execute("SELECT sha FROM commits")}
+    missing = [sha for sha in shas if sha not in cached]
+    if not missing:
+        return 0
+    cmd = ["git", "log", "--no-walk=unsorted", "--stdin", "-z", "--name-status", "-M", f"--format={COMMIT_MARK}%H%x09%s"]
+    proc = subprocess.Popen(cmd, cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # git reads all of stdin before it starts writing, so this cannot deadlock.
+    proc.stdin.write("".join(f"{sha}\n" for sha in missing).encode("ascii"))
+    proc.stdin.close()
+    added = 0
+    with conn:
+        for sha, subject, entries in parse_log_name_status(proc.stdout):
+            conn.execute("INSERT OR REPLACE INTO commits VALUES (?, ?)", (sha, subject))
+            conn.execute("DELETE FROM changes WHERE sha = ?", (sha,))
+            conn.executemany(
+                "INSERT INTO changes VALUES (?, ?, ?, ?)",
+                [(sha, entry.status, entry.path, entry.orig_path) for entry in entries],
+            )
+            added += 1
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+    return added
+
+
+def classify_range(
+    rev_range: str,
+    matcher: BucketMatcher,
+    cache_path: str = COMMIT_CACHE_PATH,
+    cwd: str = APP_ROOT,
+) -> Tuple[List[dict], int, int]:
+    """Per-change records (newest commit first) for a revision range, plus (commits, newly read)."""
+    shas = git_output(["rev-list", rev_range], cwd).split()
+    conn = open_commit_cache(cache_path)
+    try:
+        added = cache_commits(conn, shas, cwd)
+        prefix = repo_prefix(cwd)
+        subjects = {}
+        changes: Dict[str, List[StatusEntry]] = {sha: [] for sha in shas}
+        # Bounded batches keep the IN list under SQLite's parameter limit.
+        for start in range(0, len(shas), 500):
+            batch = shas[start:start + 500]
+            marks = ", ".join("?" for _ in batch)
+            subjects.update(conn.execute(f"SELECT sha, subject FROM commits WHERE sha IN ({marks})", batch))
+            for sha, status, path, orig_path in conn.execute(
+                f"SELECT sha, status, path, orig_path FROM changes WHERE sha IN ({marks}) ORDER BY rowid", batch
+            ):
+                changes[sha].append(StatusEntry(status, path, orig_path))
+    finally:
+        conn.close()
+    records = []
+    for sha in shas:
+        for entry in changes[sha]:
+            entry = entry._replace(
+                path=relative_to(entry.path, prefix),
+                orig_path=relative_to(entry.orig_path, prefix) if entry.orig_path else None,
+            )
+            record = entry_record(entry, matcher.bucket_for(entry.path, entry.status))
+            del record["repo"]
+            records.append(dict(record, commit=sha, subject=subjects.get(sha, "")))
+    return records, len(shas), added
+
+
+def summarize_range(records: List[dict], names: List[str]) -> "OrderedDict[str, dict]":
+    """Per-bucket commit list, change count and status histogram."""
+    summary = OrderedDict((name, {"commits": OrderedDict(), "changes": 0, "statuses": {}}) for name in names + ["other"])
+    for record in records:
+        bucket = summary[record["bucket"]]
+        bucket["changes"] += 1
+        bucket["statuses"][record["status"]] = bucket["statuses"].get(record["status"], 0) + 1
+        commit = bucket["commits"].setdefault(record["commit"], {"commit": record["commit"], "subject": record["subject"], "changes": 0})
+        commit["changes"] += 1
+    return OrderedDict((name, bucket) for name, bucket in summary.items() if bucket["changes"])
+
+
+def print_range(rev_range: str, commit_count: int, summary: "OrderedDict[str, dict]") -> None:
+    print(f"[range {rev_range}] {commit_count} commits")
+    print()
+    for bucket, info in summary.items():
+        statuses = ", ".join(f"{status} {count}" for status, count in sorted(info["statuses"].items()))
+        print(f"[{bucket}] {len(info['commits'])} commits, {info['changes']} changes ({statuses})")
+        for commit in info["commits"].values():
+            print(f"  {commit['commit'][:7]} {commit['subject']} ({commit['changes']})")
+        print()
+
+
+def range_report(args: argparse.Namespace, matcher: BucketMatcher) -> int:
+    started = time.perf_counter()
+    records, commit_count, added = classify_range(args.range, matcher, args.commit_cache)
+    print(
+        f"Classified {commit_count} commits ({added} read from git, {commit_count - added} cached) "
+        f"in {time.perf_counter() - started:.2f}s",
+        file=sys.stderr,
+    )
+    summary = summarize_range(records, matcher.names)
+    if args.format == "json":
+        output = {
+            "range": args.range,
+            "commits": commit_count,
+            "buckets": {
+                bucket: dict(info, commits=list(info["commits"].values())) for bucket, info in summary.items()
+            },
+        }
+        json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
         print()
+    elif args.format == "ndjson":
+        for record in records:
+            print(json.dumps({"type": "change", **record}, ensure_ascii=False))
+    else:
+        print_range(args.range, commit_count, summary)
+    return 0
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Group `git status` entries into review buckets.")
+    parser.add_argument(
+        "--config",
+        default=CONFIG_PATH,
+        help="Bucket rules file (default: scripts/worktree-buckets.json)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print each entry as soon as git reports it instead of grouping at the end",
+    )
+    parser.add_argument(
+        "--no-submodules",
+        action="store_true",
+        help="Only report the app's own repository, not the superproject or submodules",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Show added/removed lines and byte sizes per bucket",
+    )
+    parser.add_argument(
+        "--checks",
+        action="store_true",
+        help="Print the checks covering the dirty buckets",
+    )
+    parser.add_argument(
+        "--run-checks",
+        action="store_true",
+        help="Run the checks covering the dirty buckets in parallel (exit 1 on failure)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Parallel checks for --run-checks",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("text", "json", "ndjson"),
+        default="text",
+        help="Output format; json/ndjson records carry bucket, status, path, orig_path and repo",
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="Report changes since the last snapshot and append this run to the snapshot log",
+    )
+    parser.add_argument(
+        "--snapshot-log",
+        default=SNAPSHOT_LOG_PATH,
+        help="Append-only NDJSON snapshot log used by --snapshot",
+    )
+    parser.add_argument(
+        "--range",
+        help="Classify the changes of a commit range (e.g. v1.2.0..HEAD) instead of the worktree",
+    )
+    parser.add_argument(
+        "--commit-cache",
+        default=COMMIT_CACHE_PATH,
+        help="SQLite cache of per-commit name-status used by --range",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and reprint buckets whose entries change (app repository only)",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Seconds between filesystem polls in --watch mode",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    matcher = load_matcher(args.config)
+    if args.range:
+        return range_report(args, matcher)
+    if args.watch:
+        return watch(args.interval, matcher)
+    repos = discover_repos()
+    if args.no_submodules:
+        repos = repos[:1]
+    app_repo = repos[0].label
+    grouped = empty_groups(matcher)
+    for entry in collect_status(repos):
+        bucket = classify(entry, matcher)
+        grouped[bucket].append(entry)
+        if args.stream and args.format == "ndjson":
+            print(json.dumps({"type": "entry", **entry_record(entry, bucket)}, ensure_ascii=False), flush=True)
+        elif args.stream and args.format == "text":
+            print(f"[{bucket}] {format_entry(entry, app_repo)}", flush=True)
+    # Arrival order interleaves repos; keep each repo's git order, app repo first.
+    order = {repo.label: index for index, repo in enumerate(repos)}
+    for items in grouped.values():
+        items.sort(key=lambda entry: order.get(entry.repo, len(order)))
+    records = [entry_record(entry, bucket) for bucket, items in grouped.items() for entry in items]
+
+    stats = bucket_stats(grouped, repos) if args.stats else None
+    changes = None
+    if args.snapshot:
+        previous = read_last_snapshot(args.snapshot_log)
+        changes = snapshot_changes(previous, records)
+        if previous is None or changes["added"] or changes["removed"]:
+            append_snapshot(args.snapshot_log, records)
+    commands = checks_for(grouped, matcher, app_repo) if args.checks or args.run_checks else None
+
+    if args.format == "json":
+        output = {"entries": records}
+        if stats is not None:
+            output["stats"] = {bucket: stats[bucket]._asdict() for bucket, items in grouped.items() if items}
+        if changes is not None:
+            output["changes"] = changes
+        if commands is not None:
+            output["checks"] = commands
+        json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.format == "ndjson":
+        lines = [] if args.stream else [{"type": "entry", **record} for record in records]
+        if stats is not None:
+            lines += [
+                {"type": "stats", "bucket": bucket, **stats[bucket]._asdict()}
+                for bucket, items in grouped.items()
+                if items
+            ]
+        if changes is not None:
+            lines += [
+                {"type": "change", "change": key, "since": changes["since"], **record}
+                for key in ("added", "removed")
+                for record in changes[key]
+            ]
+        lines += [{"type": "check", "command": command} for command in commands or []]
+        for line in lines:
+            print(json.dumps(line, ensure_ascii=False))
+    else:
+        if not args.stream:
+            print_buckets(grouped, app_repo=app_repo, stats=stats)
+        elif stats is not None:
+            print()
+            for bucket, items in grouped.items():
+                if items:
+                    print(f"[{bucket}] {format_stats(stats[bucket])}")
+        if changes is not None:
+            print_changes(changes, app_repo)
+        if commands is not None:
+            print("[checks]" if commands else "[checks] none")
+            for command in commands:
+                print(f"  {command}")
+            print()
+
+    if args.run_checks and commands:
+        return run_checks(commands, args.jobs, sys.stdout if args.format == "text" else sys.stderr)
     return 0
 
 